@@ -0,0 +1,334 @@
+"""Load generator and latency SLO gate for the prediction API
+
+Starts the API under uvicorn (or targets --url), drives /predict,
+/batch_predict and /update_user_events with a configurable mix, concurrency,
+arrival rate and user-ID distribution, and reports throughput and latency
+percentiles per endpoint. Exits with status 1 when an SLO is breached.
+
+Usage:
+    python -m benchmarks.load_test --duration 30 --concurrency 32 --users zipf
+    python -m benchmarks.load_test --rate 200 --slo /predict:p99_ms=50 --slo '*:error_rate=0.01'
+    python -m benchmarks.load_test --compare old.json new.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from .run_benchmarks import RESULTS_DIR, git_commit
+
+DEFAULT_MIX = {"/predict": 0.8, "/batch_predict": 0.15, "/update_user_events": 0.05}
+METRICS = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "error_rate",
+           "client_error_rate", "server_error_rate")
+SNAPSHOT_PATH = os.path.join(os.path.dirname(__file__), "..", "src", "data",
+                             "user_features.snap")
+
+
+class UserSampler:
+    """Draw user IDs uniformly or from a Zipf law over a shuffled user list"""
+
+    def __init__(self, user_ids, distribution: str = "uniform", zipf_s: float = 1.1,
+                 seed: int = 0):
+        self.rng = np.random.default_rng(seed)
+        self.user_ids = self.rng.permutation(np.asarray(user_ids))
+        if distribution == "uniform":
+            self.cdf = None
+        elif distribution == "zipf":
+            weights = 1.0 / np.arange(1, len(self.user_ids) + 1) ** zipf_s
+            self.cdf = np.cumsum(weights / weights.sum())
+        else:
+            raise ValueError(f"Unknown user distribution: {distribution}")
+
+    def sample(self, size: Optional[int] = None):
+        if self.cdf is None:
+            return self.user_ids[self.rng.integers(len(self.user_ids), size=size)]
+        positions = np.searchsorted(self.cdf, self.rng.random(size), side="right")
+        return self.user_ids[np.minimum(positions, len(self.user_ids) - 1)]
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        endpoint, weight = part.split("=")
+        endpoint = endpoint if endpoint.startswith("/") else f"/{endpoint}"
+        if endpoint not in DEFAULT_MIX:
+            raise ValueError(f"Unknown endpoint in mix: {endpoint}")
+        mix[endpoint] = float(weight)
+    total = sum(mix.values())
+    return {endpoint: weight / total for endpoint, weight in mix.items()}
+
+
+def parse_slo(text: str) -> Tuple[str, str, float]:
+    """'ENDPOINT:METRIC=LIMIT', e.g. '/predict:p99_ms=50' or '*:error_rate=0.01'"""
+    target, limit = text.rsplit("=", 1)
+    endpoint, metric = target.rsplit(":", 1)
+    if metric not in METRICS:
+        raise ValueError(f"Unknown SLO metric '{metric}', expected one of {METRICS}")
+    return endpoint, metric, float(limit)
+
+
+def check_slos(report: Dict, slos: List[Tuple[str, str, float]]) -> List[str]:
+    """Return a message for every breached SLO
+
+    throughput_rps is a floor; every other metric is a ceiling.
+    """
+    breaches = []
+    for endpoint, metric, limit in slos:
+        targets = report["endpoints"] if endpoint == "*" else {
+            endpoint: report["endpoints"].get(endpoint)
+        }
+        for name, stats in targets.items():
+            if stats is None:
+                breaches.append(f"{name}: no requests were made")
+                continue
+            value = stats[metric]
+            breached = value < limit if metric == "throughput_rps" else value > limit
+            if breached:
+                breaches.append(f"{name} {metric}={value:.4g} (limit {limit:g})")
+    return breaches
+
+
+def make_request(endpoint: str, sampler: UserSampler, batch_size: int):
+    if endpoint == "/predict":
+        return {"user_id": int(sampler.sample())}
+    if endpoint == "/batch_predict":
+        return [int(u) for u in sampler.sample(batch_size)]
+    now = datetime.now()
+    user_id = int(sampler.sample())
+    return [
+        {"userId": user_id, "sessionId": 1, "page": "NextSong", "auth": "Logged In",
+         "ts": (now + timedelta(seconds=i)).isoformat(), "itemInSession": i,
+         "length": 240.0, "artist": "Artist", "song": "Song"}
+        for i in range(5)
+    ]
+
+
+async def run_load(base_url: str, sampler: UserSampler, mix: Dict[str, float],
+                   concurrency: int, duration: float, rate: float,
+                   batch_size: int, seed: int = 0) -> Tuple[List[tuple], float]:
+    """Send requests for duration seconds and record (endpoint, latency, status)
+
+    status is the HTTP status code, or 0 when the request failed outright.
+
+    With rate > 0 arrivals are open-loop Poisson and latency is measured
+    from the scheduled send time, so queueing behind the concurrency limit
+    counts against the server. With rate = 0 each of the concurrency
+    workers sends its next request as soon as the previous one returns.
+    """
+    rng = np.random.default_rng(seed)
+    endpoints = list(mix)
+    weights = np.array([mix[e] for e in endpoints])
+    samples = []
+    limits = httpx.Limits(max_connections=concurrency,
+                          max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def send(endpoint: str, scheduled: float):
+            payload = make_request(endpoint, sampler, batch_size)
+            try:
+                status = (await client.post(endpoint, json=payload)).status_code
+            except httpx.HTTPError:
+                status = 0
+            samples.append((endpoint, time.perf_counter() - scheduled, status))
+
+        start = time.perf_counter()
+        deadline = start + duration
+
+        if rate > 0:
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def limited(endpoint: str, scheduled: float):
+                async with semaphore:
+                    await send(endpoint, scheduled)
+
+            tasks = []
+            next_time = start
+            while True:
+                next_time += rng.exponential(1.0 / rate)
+                if next_time >= deadline:
+                    break
+                await asyncio.sleep(max(0.0, next_time - time.perf_counter()))
+                endpoint = endpoints[rng.choice(len(endpoints), p=weights)]
+                tasks.append(asyncio.create_task(limited(endpoint, next_time)))
+            await asyncio.gather(*tasks)
+        else:
+            async def worker():
+                while time.perf_counter() < deadline:
+                    endpoint = endpoints[rng.choice(len(endpoints), p=weights)]
+                    await send(endpoint, time.perf_counter())
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+        elapsed = time.perf_counter() - start
+    return samples, elapsed
+
+
+def summarize(samples: List[tuple], elapsed: float) -> Dict:
+    def stats(rows):
+        latencies = np.array([latency for _, latency, _ in rows]) * 1000
+        statuses = np.array([status for _, _, status in rows])
+        # Anything but 2xx is an error: a 404 or 422 never reached scoring
+        errors = int(((statuses < 200) | (statuses >= 300)).sum())
+        client_errors = int(((statuses >= 400) & (statuses < 500)).sum())
+        server_errors = int(((statuses >= 500) | (statuses == 0)).sum())
+        return {
+            "requests": len(rows),
+            "errors": errors,
+            "error_rate": errors / len(rows),
+            "client_error_rate": client_errors / len(rows),
+            "server_error_rate": server_errors / len(rows),
+            "throughput_rps": len(rows) / elapsed,
+            "mean_ms": float(latencies.mean()),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+        }
+
+    by_endpoint = {}
+    for row in samples:
+        by_endpoint.setdefault(row[0], []).append(row)
+    return {
+        "elapsed_s": elapsed,
+        "overall": stats(samples) if samples else {},
+        "endpoints": {name: stats(rows) for name, rows in sorted(by_endpoint.items())},
+    }
+
+
+def print_report(report: Dict):
+    print(f"{'endpoint':<24}{'requests':>10}{'rps':>10}{'p50 ms':>10}"
+          f"{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    rows = list(report["endpoints"].items()) + [("overall", report["overall"])]
+    for name, s in rows:
+        print(f"{name:<24}{s['requests']:>10}{s['throughput_rps']:>10.1f}"
+              f"{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}"
+              f"{s['errors']:>8}")
+
+
+def compare(old_path: str, new_path: str):
+    """Print each endpoint metric of two load-test reports side by side"""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    print(f"{'endpoint':<24}{'metric':<16}{old['commit']:>12}{new['commit']:>12}"
+          f"{'change':>10}")
+    for name in sorted(old["endpoints"].keys() & new["endpoints"].keys()):
+        for metric in METRICS:
+            a, b = old["endpoints"][name].get(metric), new["endpoints"][name].get(metric)
+            if a is None or b is None:
+                continue
+            change = f"{(b - a) / a * 100:+.1f}%" if a else "n/a"
+            print(f"{name:<24}{metric:<16}{a:>12.4g}{b:>12.4g}{change:>10}")
+
+
+def start_server(port: int, workers: int, log_path: str) -> subprocess.Popen:
+    """Start the API under uvicorn and wait until it answers"""
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    # The server inherits its own descriptor, so ours can be closed right away
+    with open(log_path, "w") as log:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "src.api.main:app", "--host", "127.0.0.1",
+             "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+            cwd=root, stdout=log, stderr=subprocess.STDOUT,
+        )
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"API exited with code {server.returncode}, see {log_path}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError(f"API did not start within 120s, see {log_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="target a running API instead of starting one")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--server-workers", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--concurrency", type=int, default=16,
+                        help="maximum requests in flight")
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="open-loop arrivals per second (0 = closed loop)")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="e.g. predict=0.8,batch_predict=0.15,update_user_events=0.05")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--users", choices=["uniform", "zipf"], default="uniform")
+    parser.add_argument("--zipf-s", type=float, default=1.1)
+    parser.add_argument("--slo", type=parse_slo, action="append", default=[],
+                        help="ENDPOINT:METRIC=LIMIT, e.g. /predict:p99_ms=50")
+    parser.add_argument("--output", help="report file (default: results/load_<time>_<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="compare two reports instead of running")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    from src.data.feature_snapshot import load_snapshot
+
+    sampler = UserSampler(np.asarray(load_snapshot(SNAPSHOT_PATH).user_ids),
+                          args.users, args.zipf_s, args.seed)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    server = None
+    base_url = args.url
+    if base_url is None:
+        server = start_server(args.port, args.server_workers,
+                              os.path.join(RESULTS_DIR, "load_test_server.log"))
+        base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        samples, elapsed = asyncio.run(run_load(
+            base_url, sampler, args.mix, args.concurrency, args.duration, args.rate,
+            args.batch_size, args.seed,
+        ))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if not samples:
+        sys.exit("No requests completed")
+    report = summarize(samples, elapsed)
+    report.update({
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "config": {k: v for k, v in vars(args).items()
+                   if k not in ("compare", "output", "slo")},
+        "slos": [list(slo) for slo in args.slo],
+    })
+    breaches = check_slos(report, args.slo)
+    report["slo_breaches"] = breaches
+    print_report(report)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR,
+        f"load_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{report['commit']}.json",
+    )
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {output}")
+
+    if breaches:
+        print("SLO breached:\n  " + "\n  ".join(breaches))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
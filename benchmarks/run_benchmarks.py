@@ -0,0 +1,260 @@
+"""Benchmark suite for preprocessing, feature engineering and serving
+
+Usage:
+    python -m benchmarks.run_benchmarks --sizes 10000 100000
+    python -m benchmarks.run_benchmarks --compare old.json new.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from src.data import feature_engineering as fe
+from src.data.point_in_time import create_point_in_time_features
+from src.data.preprocessing import (
+    clean_user_ids,
+    convert_timestamps,
+    create_location_features,
+    impute_missing_userids,
+)
+from src.monitoring.drift_detection import DriftDetector
+
+from .synthetic_data import generate_event_log
+
+DEFAULT_SIZES = [10**4, 10**5, 10**6, 10**7]
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+FEATURE_FUNCTIONS = [
+    fe.create_activity_features,
+    fe.create_listening_features,
+    fe.create_engagement_features,
+    fe.create_subscription_features,
+    fe.create_issues_features,
+    fe.create_temporal_features,
+    fe.create_session_pattern_features,
+    fe.create_all_features,
+    fe.create_all_features_partitioned,
+]
+
+
+def time_call(func: Callable, *args, repeat: int = 1):
+    """Run func repeat times, return the last result and the wall times"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    return result, timings
+
+
+def make_record(name: str, n_events: int, timings: List[float], **extra) -> Dict:
+    record = {
+        "name": name,
+        "n_events": n_events,
+        "seconds": timings,
+        "best": min(timings),
+        "mean": float(np.mean(timings)),
+    }
+    record.update(extra)
+    return record
+
+
+def bench_pipeline(n_events: int, repeat: int, skip: List[str]) -> List[Dict]:
+    """Time the preprocessing steps, each feature group and drift detection"""
+    records = []
+    raw = generate_event_log(n_events)
+    df = clean_user_ids(convert_timestamps(raw))
+    del raw
+
+    if "impute_missing_userids" in skip:
+        df = df.dropna(subset=["userId"])
+    else:
+        df, timings = time_call(impute_missing_userids, df, repeat=repeat)
+        records.append(make_record("impute_missing_userids", n_events, timings))
+        print(f"  impute_missing_userids: {min(timings):.3f}s")
+
+    df = create_location_features(df)
+    df = df.dropna(subset=["userId"]).reset_index(drop=True)
+    df["userId"] = df["userId"].astype(int)
+
+    features = None
+    for func in FEATURE_FUNCTIONS:
+        if func.__name__ in skip:
+            continue
+        result, timings = time_call(func, df, repeat=repeat)
+        if func is fe.create_all_features:
+            features = result
+        records.append(make_record(func.__name__, n_events, timings))
+        print(f"  {func.__name__}: {min(timings):.3f}s")
+
+    if "create_point_in_time_features" not in skip:
+        cutoffs = pd.date_range(df["ts"].min(), df["ts"].max(), freq="7D")[1:]
+        _, timings = time_call(create_point_in_time_features, df, cutoffs, "30D",
+                               repeat=repeat)
+        records.append(make_record("create_point_in_time_features", n_events, timings,
+                                   n_cutoffs=len(cutoffs)))
+        print(f"  create_point_in_time_features ({len(cutoffs)} cutoffs): "
+              f"{min(timings):.3f}s")
+
+    if features is not None and "detect_drift" not in skip:
+        reference = features.drop(columns="is_churned")
+        rng = np.random.default_rng(0)
+        current = reference * rng.normal(1.0, 0.05, size=reference.shape)
+        detector = DriftDetector(reference)
+        _, timings = time_call(detector.detect_drift, current, repeat=repeat)
+        records.append(make_record("detect_drift", n_events, timings,
+                                   n_users=len(reference)))
+        print(f"  detect_drift: {min(timings):.3f}s")
+
+    return records
+
+
+def bench_serving(n_requests: int, batch_size: int, skip: List[str]) -> List[Dict]:
+    """Time /predict and /batch_predict through an in-process client"""
+    from fastapi.testclient import TestClient
+
+    from src.api.main import app, feature_snapshot
+
+    records = []
+    user_ids = np.asarray(feature_snapshot.user_ids)
+    rng = np.random.default_rng(0)
+
+    # Keep API prints (model loading) out of the benchmark output
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        with TestClient(app) as client:
+            if "predict" not in skip:
+                latencies = []
+                for user_id in rng.choice(user_ids, size=n_requests):
+                    start = time.perf_counter()
+                    response = client.post("/predict", json={"user_id": int(user_id)})
+                    latencies.append(time.perf_counter() - start)
+                    response.raise_for_status()
+                records.append(latency_record("/predict", latencies))
+
+            if "batch_predict" not in skip:
+                latencies = []
+                for _ in range(max(1, n_requests // batch_size)):
+                    batch = [int(u) for u in rng.choice(user_ids, size=batch_size)]
+                    start = time.perf_counter()
+                    response = client.post("/batch_predict", json=batch)
+                    latencies.append(time.perf_counter() - start)
+                    response.raise_for_status()
+                records.append(latency_record("/batch_predict", latencies,
+                                              batch_size=batch_size))
+
+    for record in records:
+        print(f"  {record['name']}: p50={record['p50_ms']:.2f}ms "
+              f"p99={record['p99_ms']:.2f}ms")
+    return records
+
+
+def latency_record(name: str, latencies: List[float], **extra) -> Dict:
+    ms = np.asarray(latencies) * 1000
+    record = {
+        "name": name,
+        "n_requests": len(latencies),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "best": float(ms.min() / 1000),
+    }
+    record.update(extra)
+    return record
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(sizes: List[int], repeat: int, n_requests: int, batch_size: int,
+        skip: List[str]) -> Dict:
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "pipeline": [],
+        "serving": [],
+    }
+    for n_events in sizes:
+        print(f"Pipeline benchmarks at {n_events:,} events")
+        results["pipeline"].extend(bench_pipeline(n_events, repeat, skip))
+    if n_requests > 0:
+        print(f"Serving benchmarks ({n_requests} requests)")
+        results["serving"] = bench_serving(n_requests, batch_size, skip)
+    return results
+
+
+def compare(old_path: str, new_path: str):
+    """Print the speed ratio of every benchmark present in both result files"""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    def index(results):
+        rows = {}
+        for record in results["pipeline"] + results["serving"]:
+            rows[(record["name"], record.get("n_events", 0))] = record["best"]
+        return rows
+
+    old_rows, new_rows = index(old), index(new)
+    print(f"{'benchmark':<36}{'events':>12}{old['commit']:>12}{new['commit']:>12}{'ratio':>8}")
+    for key in sorted(old_rows.keys() & new_rows.keys()):
+        name, n_events = key
+        ratio = old_rows[key] / new_rows[key] if new_rows[key] else float("inf")
+        print(f"{name:<36}{n_events:>12,}{old_rows[key]:>12.4f}"
+              f"{new_rows[key]:>12.4f}{ratio:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="event log sizes to benchmark")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=500,
+                        help="number of /predict calls (0 disables serving)")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--skip", nargs="*", default=[],
+                        help="benchmark names to skip, e.g. impute_missing_userids")
+    parser.add_argument("--output", help="results file (default: results/<time>_<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="compare two result files instead of running")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = run(args.sizes, args.repeat, args.requests, args.batch_size, args.skip)
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}_{results['commit']}.json")
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
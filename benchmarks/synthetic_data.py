@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+PAGES = [
+    'NextSong', 'Home', 'Thumbs Up', 'Add to Playlist', 'Add Friend',
+    'Roll Advert', 'Logout', 'Thumbs Down', 'Downgrade', 'Settings', 'Help',
+    'Upgrade', 'About', 'Save Settings', 'Error', 'Submit Upgrade',
+    'Submit Downgrade',
+]
+PAGE_WEIGHTS = np.array([
+    80.0, 3.6, 4.4, 2.3, 1.5, 1.4, 1.1, 0.9, 0.7, 0.5, 0.5,
+    0.2, 0.2, 0.1, 0.1, 0.05, 0.05,
+])
+LOCATIONS = [
+    'Los Angeles-Long Beach-Anaheim, CA', 'New York-Newark-Jersey City, NY-NJ-PA',
+    'Dallas-Fort Worth-Arlington, TX', 'Boston-Cambridge-Newton, MA-NH',
+    'Chicago-Naperville-Elgin, IL-IN-WI', 'Houston-The Woodlands-Sugar Land, TX',
+    'Phoenix-Mesa-Scottsdale, AZ', 'Seattle-Tacoma-Bellevue, WA',
+]
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 6.1; WOW64; rv:31.0) Gecko/20100101 Firefox/31.0',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_9_4) AppleWebKit/537.36',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 7_1_2 like Mac OS X) AppleWebKit/537.51.2',
+]
+
+START_MS = 1538352000000  # 2018-10-01, matches the original event log
+DAY_MS = 24 * 3600 * 1000
+
+
+def generate_event_log(n_events: int, n_users: int = None, missing_rate: float = 0.03,
+                       churn_rate: float = 0.23, n_artists: int = 5000,
+                       n_songs: int = 50000, seed: int = 42) -> pd.DataFrame:
+    """Generate a raw event log with the schema expected by preprocess_pipeline
+
+    Events are drawn per user, split into sessions with consecutive
+    itemInSession values and then shuffled into timestamp order, like the
+    original log. A fraction of userIds is blanked so that
+    impute_missing_userids has real work to do.
+    """
+    rng = np.random.default_rng(seed)
+    if n_users is None:
+        n_users = max(20, n_events // 1000)
+
+    # Events grouped by user, then split into sessions of ~60 items
+    user_idx = np.sort(rng.integers(0, n_users, size=n_events))
+    new_user = np.r_[True, user_idx[1:] != user_idx[:-1]]
+    new_session = new_user | (rng.random(n_events) < 1 / 60)
+    session_idx = np.cumsum(new_session) - 1
+    session_start = np.flatnonzero(new_session)
+    item_in_session = np.arange(n_events) - session_start[session_idx]
+
+    # Session ids are reused across users, as in the original data
+    n_sessions = session_start.size
+    session_ids = rng.permutation(n_sessions) % max(1, n_sessions // 2) + 1
+
+    # Each session starts at a random time in a 60-day window, items 4 min apart
+    session_ts = START_MS + rng.integers(0, 60 * DAY_MS, size=n_sessions)
+    ts = session_ts[session_idx] + item_in_session * 240000
+
+    user_ids = np.arange(n_users) + 1
+    registration = START_MS - rng.integers(DAY_MS, 365 * DAY_MS, size=n_users)
+    page = np.asarray(PAGES, dtype=object)[
+        rng.choice(len(PAGES), size=n_events, p=PAGE_WEIGHTS / PAGE_WEIGHTS.sum())
+    ]
+
+    # Churned users end their last session on the cancellation page
+    last_event = np.r_[np.flatnonzero(new_user)[1:], n_events] - 1
+    churned = rng.random(last_event.size) < churn_rate
+    page[last_event[churned]] = 'Cancellation Confirmation'
+
+    is_song = page == 'NextSong'
+    n_song_events = int(is_song.sum())
+    song = np.full(n_events, None, dtype=object)
+    artist = np.full(n_events, None, dtype=object)
+    length = np.full(n_events, np.nan)
+    song_idx = rng.integers(0, n_songs, size=n_song_events)
+    song[is_song] = np.char.add('Song ', song_idx.astype(str)).astype(object)
+    artist[is_song] = np.char.add('Artist ', (song_idx % n_artists).astype(str)).astype(object)
+    length[is_song] = rng.normal(248.0, 60.0, size=n_song_events).clip(30.0)
+
+    user_level = np.where(rng.random(n_users) < 0.6, 'paid', 'free').astype(object)
+    user_location = np.asarray(LOCATIONS, dtype=object)[rng.integers(0, len(LOCATIONS), n_users)]
+    user_gender = np.where(rng.random(n_users) < 0.5, 'F', 'M').astype(object)
+    user_agent = np.asarray(USER_AGENTS, dtype=object)[rng.integers(0, len(USER_AGENTS), n_users)]
+
+    df = pd.DataFrame({
+        'ts': ts,
+        'userId': user_ids[user_idx].astype(str).astype(object),
+        'sessionId': session_ids[session_idx],
+        'page': page,
+        'auth': 'Logged In',
+        'method': np.where(is_song, 'PUT', 'GET').astype(object),
+        'status': 200,
+        'level': user_level[user_idx],
+        'itemInSession': item_in_session,
+        'location': user_location[user_idx],
+        'userAgent': user_agent[user_idx],
+        'lastName': 'Last',
+        'firstName': 'First',
+        'registration': registration[user_idx].astype(float),
+        'gender': user_gender[user_idx],
+        'artist': artist,
+        'song': song,
+        'length': length,
+    })
+
+    # Logged-out looking rows: blank userId and user attributes
+    missing = rng.random(n_events) < missing_rate
+    df.loc[missing, 'userId'] = ''
+    df.loc[missing, ['location', 'userAgent', 'lastName', 'firstName', 'gender']] = None
+    df.loc[missing, 'registration'] = np.nan
+
+    return df.sort_values('ts', kind='stable').reset_index(drop=True)
@@ -0,0 +1,403 @@
+"""Async feature and prediction-log backends for the API
+
+Feature stores answer single and batched lookups; prediction logs buffer
+records and write them in bulk. Every backend pools its connections, so
+concurrent requests never open one per call:
+
+    SnapshotFeatureStore   in-process memory-mapped snapshot (default)
+    RedisFeatureStore      Redis via redis.asyncio, or InMemoryRedis offline
+    SQLitePredictionStore  local stand-in for the prediction database
+    PostgresPredictionStore  asyncpg pool, COPY for bulk inserts
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ..data.feature_snapshot import FeatureSnapshot
+
+logger = logging.getLogger(__name__)
+
+PREDICTION_COLUMNS = ("user_id", "churn_probability", "churn_prediction",
+                      "risk_level", "model_version", "created_at")
+
+
+class FeatureStore(ABC):
+    """Interface of the async feature backends"""
+
+    async def get(self, user_id: int) -> Optional[Dict[str, float]]:
+        return (await self.get_many([user_id]))[0]
+
+    @abstractmethod
+    async def get_many(self, user_ids: Sequence[int]) -> List[Optional[Dict[str, float]]]:
+        """Features of each user, None for unknown users"""
+
+    async def close(self):
+        pass
+
+
+class SnapshotFeatureStore(FeatureStore):
+    """Features served from a FeatureSnapshot in this process"""
+
+    def __init__(self, snapshot: FeatureSnapshot):
+        self.snapshot = snapshot
+
+    def swap(self, snapshot: FeatureSnapshot):
+        # Callers already holding the old snapshot keep using its mapping
+        self.snapshot = snapshot
+
+    async def get(self, user_id: int) -> Optional[Dict[str, float]]:
+        return self.snapshot.get(user_id)
+
+    async def get_many(self, user_ids: Sequence[int]) -> List[Optional[Dict[str, float]]]:
+        snapshot = self.snapshot
+        return [snapshot.get(user_id) for user_id in user_ids]
+
+
+class InMemoryRedis:
+    """Minimal asyncio Redis stand-in: GET, SET, MGET and pipelines"""
+
+    def __init__(self):
+        self._data: Dict[str, bytes] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._data.get(key)
+
+    async def set(self, key: str, value) -> bool:
+        self._data[key] = value if isinstance(value, bytes) else str(value).encode()
+        return True
+
+    async def mget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        return [self._data.get(key) for key in keys]
+
+    def pipeline(self, transaction: bool = False) -> "_InMemoryPipeline":
+        return _InMemoryPipeline(self)
+
+    async def aclose(self):
+        pass
+
+
+class _InMemoryPipeline:
+    def __init__(self, client: InMemoryRedis):
+        self._client = client
+        self._commands = []
+
+    def get(self, key: str):
+        self._commands.append((self._client.get, (key,)))
+        return self
+
+    def set(self, key: str, value):
+        self._commands.append((self._client.set, (key, value)))
+        return self
+
+    async def execute(self) -> list:
+        commands, self._commands = self._commands, []
+        return [await command(*args) for command, args in commands]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self._commands = []
+
+
+class RedisFeatureStore(FeatureStore):
+    """Features stored in Redis as packed float32 vectors, one key per user
+
+    Works with a redis.asyncio client (which pools its connections) or with
+    InMemoryRedis. Batches are fetched with MGET in chunks, one round trip
+    per chunk. Features are written by publish(), usually through
+    `python -m src.api.backends publish`; the feature order is read once and
+    cached until reset().
+    """
+
+    def __init__(self, client, prefix: str = "features", chunk_size: int = 1000):
+        self.client = client
+        self.prefix = prefix
+        self.chunk_size = chunk_size
+        self._feature_names: Optional[List[str]] = None
+
+    @classmethod
+    def from_url(cls, url: str, pool_size: int = 10, **kwargs) -> "RedisFeatureStore":
+        import redis.asyncio as redis
+
+        return cls(redis.from_url(url, max_connections=pool_size), **kwargs)
+
+    def _key(self, user_id) -> str:
+        return f"{self.prefix}:{int(user_id)}"
+
+    async def is_published(self) -> bool:
+        return await self.client.get(f"{self.prefix}:__feature_names__") is not None
+
+    def reset(self):
+        """Forget the cached feature order so a republished one is picked up"""
+        self._feature_names = None
+
+    async def feature_names(self) -> List[str]:
+        if self._feature_names is None:
+            raw = await self.client.get(f"{self.prefix}:__feature_names__")
+            if raw is None:
+                raise RuntimeError(f"No features published under '{self.prefix}'")
+            self._feature_names = json.loads(raw)
+        return self._feature_names
+
+    async def publish(self, snapshot: FeatureSnapshot):
+        """Write every user of a snapshot with pipelined SETs"""
+        names = snapshot.feature_names
+        for start in range(0, len(snapshot), self.chunk_size):
+            async with self.client.pipeline(transaction=False) as pipe:
+                for pos in range(start, min(start + self.chunk_size, len(snapshot))):
+                    vector = np.ascontiguousarray(snapshot.matrix[:, pos], dtype="<f4")
+                    pipe.set(self._key(snapshot.user_ids[pos]), vector.tobytes())
+                await pipe.execute()
+        await self.client.set(f"{self.prefix}:__feature_names__", json.dumps(names))
+        self._feature_names = list(names)
+
+    async def get_many(self, user_ids: Sequence[int]) -> List[Optional[Dict[str, float]]]:
+        names = await self.feature_names()
+        results = []
+        for start in range(0, len(user_ids), self.chunk_size):
+            chunk = user_ids[start:start + self.chunk_size]
+            values = await self.client.mget([self._key(user_id) for user_id in chunk])
+            for raw in values:
+                if raw is None:
+                    results.append(None)
+                else:
+                    results.append(dict(zip(names, np.frombuffer(raw, dtype="<f4").tolist())))
+        return results
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class PredictionStore(ABC):
+    """Interface of the async prediction-log backends"""
+
+    async def connect(self):
+        pass
+
+    @abstractmethod
+    async def insert_many(self, rows: Sequence[tuple]):
+        """Write rows of PREDICTION_COLUMNS values"""
+
+    async def close(self):
+        pass
+
+
+class NullPredictionStore(PredictionStore):
+    """Discard predictions (the default when no log backend is configured)"""
+
+    async def insert_many(self, rows: Sequence[tuple]):
+        pass
+
+
+class SQLitePredictionStore(PredictionStore):
+    """Prediction log in SQLite, a local stand-in for the prediction database
+
+    sqlite3 is blocking, so statements run in worker threads on connections
+    taken from a fixed-size pool.
+    """
+
+    def __init__(self, path: str, pool_size: int = 4):
+        self.path = path
+        self.pool_size = pool_size
+        self._pool: Optional[asyncio.Queue] = None
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    async def connect(self):
+        self._pool = asyncio.Queue()
+        for _ in range(self.pool_size):
+            self._pool.put_nowait(await asyncio.to_thread(self._open))
+        await self._run(lambda conn: conn.execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            "user_id INTEGER, churn_probability REAL, churn_prediction INTEGER, "
+            "risk_level TEXT, model_version TEXT, created_at TEXT)"
+        ))
+
+    async def _run(self, func):
+        conn = await self._pool.get()
+        try:
+            return await asyncio.to_thread(self._transaction, conn, func)
+        finally:
+            self._pool.put_nowait(conn)
+
+    @staticmethod
+    def _transaction(conn: sqlite3.Connection, func):
+        with conn:
+            return func(conn)
+
+    async def insert_many(self, rows: Sequence[tuple]):
+        placeholders = ", ".join("?" * len(PREDICTION_COLUMNS))
+        await self._run(lambda conn: conn.executemany(
+            f"INSERT INTO predictions ({', '.join(PREDICTION_COLUMNS)}) "
+            f"VALUES ({placeholders})", rows
+        ))
+
+    async def fetch_all(self) -> List[tuple]:
+        return await self._run(
+            lambda conn: conn.execute("SELECT * FROM predictions").fetchall()
+        )
+
+    async def close(self):
+        if self._pool is None:
+            return
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+
+class PostgresPredictionStore(PredictionStore):
+    """Prediction log in Postgres through an asyncpg pool, bulk-loaded with COPY"""
+
+    def __init__(self, dsn: str, pool_size: int = 10):
+        self.dsn = dsn
+        self.pool_size = pool_size
+        self._pool = None
+
+    async def connect(self):
+        import asyncpg
+
+        self._pool = await asyncpg.create_pool(self.dsn, min_size=1,
+                                               max_size=self.pool_size)
+        async with self._pool.acquire() as conn:
+            await conn.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                "user_id BIGINT, churn_probability DOUBLE PRECISION, "
+                "churn_prediction BOOLEAN, risk_level TEXT, model_version TEXT, "
+                "created_at TEXT)"
+            )
+
+    async def insert_many(self, rows: Sequence[tuple]):
+        rows = [(r[0], r[1], bool(r[2])) + tuple(r[3:]) for r in rows]
+        async with self._pool.acquire() as conn:
+            await conn.copy_records_to_table("predictions", records=rows,
+                                             columns=list(PREDICTION_COLUMNS))
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+
+
+class PredictionLogger:
+    """Buffer prediction records and flush them to a store in bulk
+
+    Records are flushed when batch_size accumulate or every flush_interval
+    seconds, whichever comes first. A failed flush is logged and its records
+    are dropped so that serving never blocks on the log.
+    """
+
+    def __init__(self, store: PredictionStore, model_version: str,
+                 batch_size: int = 500, flush_interval: float = 1.0):
+        self.store = store
+        self.model_version = model_version
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer: List[tuple] = []
+        self._full: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        await self.store.connect()
+        self._full = asyncio.Event()
+        self._task = asyncio.create_task(self._flush_periodically())
+
+    def log(self, user_id: int, probability: float, prediction: bool, risk_level: str):
+        self._buffer.append((int(user_id), float(probability), int(bool(prediction)),
+                             risk_level, self.model_version,
+                             datetime.now(timezone.utc).isoformat()))
+        if len(self._buffer) >= self.batch_size and self._full is not None:
+            self._full.set()
+
+    async def flush(self):
+        rows, self._buffer = self._buffer, []
+        if self._full is not None:
+            self._full.clear()
+        if not rows:
+            return
+        try:
+            await self.store.insert_many(rows)
+        except Exception:
+            logger.exception("Failed to write %d prediction records", len(rows))
+
+    async def _flush_periodically(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+        await self.store.close()
+
+
+def create_feature_store(backend: str, snapshot: FeatureSnapshot, redis_url: str,
+                         pool_size: int) -> FeatureStore:
+    if backend == "snapshot":
+        return SnapshotFeatureStore(snapshot)
+    if backend == "redis":
+        return RedisFeatureStore.from_url(redis_url, pool_size)
+    if backend == "memory":
+        return RedisFeatureStore(InMemoryRedis())
+    raise ValueError(f"Unknown feature backend: {backend}")
+
+
+def create_prediction_store(backend: str, database_url: str, sqlite_path: str,
+                            pool_size: int) -> PredictionStore:
+    if backend == "none":
+        return NullPredictionStore()
+    if backend == "sqlite":
+        return SQLitePredictionStore(sqlite_path, pool_size)
+    if backend == "postgres":
+        return PostgresPredictionStore(database_url, pool_size)
+    raise ValueError(f"Unknown prediction log backend: {backend}")
+
+
+async def _publish(snapshot_path: str, redis_url: str, prefix: str) -> int:
+    from ..data.feature_snapshot import load_snapshot
+
+    snapshot = load_snapshot(snapshot_path)
+    store = RedisFeatureStore.from_url(redis_url, prefix=prefix)
+    try:
+        await store.publish(snapshot)
+    finally:
+        await store.close()
+    return len(snapshot)
+
+
+def main():
+    from ..utils.config import settings
+
+    parser = argparse.ArgumentParser(description="Manage the API's feature backends")
+    commands = parser.add_subparsers(dest="command", required=True)
+    publish = commands.add_parser("publish", help="write a feature snapshot to Redis")
+    publish.add_argument("--snapshot", default=settings.feature_snapshot_path or os.path.join(
+        os.path.dirname(__file__), "..", "data", "user_features.snap"))
+    publish.add_argument("--redis-url", default=settings.redis_url)
+    publish.add_argument("--prefix", default="features")
+    args = parser.parse_args()
+
+    n_users = asyncio.run(_publish(args.snapshot, args.redis_url, args.prefix))
+    print(f"Published {n_users:,} users from {args.snapshot} to {args.redis_url}")
+
+
+if __name__ == "__main__":
+    main()
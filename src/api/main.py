@@ -1,17 +1,35 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 import joblib
+import logging
+import time
 import pandas as pd
 from typing import List
 import mlflow
 import mlflow.sklearn
 
-from .schemas import PredictionRequest, PredictionResponse, UserEvent
+from .backends import (
+    PredictionLogger, SnapshotFeatureStore,
+    create_feature_store, create_prediction_store,
+)
+from .schemas import PredictionRequest, PredictionResponse, UserEvent, ProfilingConfig
 from ..data.preprocessing import preprocess_pipeline
 from ..data.feature_engineering import create_all_features
+from ..data.feature_snapshot import FeatureSnapshot, load_snapshot
+from ..models.predict import align_features, assign_risk_levels, churn_scores
+from ..monitoring.instrumentation import (
+    FEATURE_CACHE, MODEL_CACHE, REQUEST_COUNT, REQUEST_LATENCY,
+    RequestProfiler, registry, span,
+)
 from ..utils.config import settings
 import os
 import joblib
+
+logger = logging.getLogger(__name__)
+profiler = RequestProfiler(settings.profile_dir)
+
 app = FastAPI(title="Customer Churn Prediction API", version="1.0.0")
 
 # Add CORS middleware
@@ -23,11 +41,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # Label by route template, not raw path, to keep cardinality bounded
+        route = request.scope.get("route")
+        endpoint = route.path if route is not None else "unmatched"
+        REQUEST_LATENCY.observe(time.perf_counter() - start, endpoint=endpoint)
+        REQUEST_COUNT.inc(endpoint=endpoint, status=status_code)
+
 # Load model at startup
 model = None
-features_path = os.path.join(os.path.dirname(__file__), "..", "data", "user_features.json")
-features_path = os.path.abspath(features_path)
-features_df = pd.read_json(features_path).set_index("user_id")
+data_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
+features_path = os.path.join(data_dir, "user_features.json")
+snapshot_path = settings.feature_snapshot_path or os.path.join(data_dir, "user_features.snap")
+
+def load_features() -> FeatureSnapshot:
+    """Memory-map the binary feature snapshot, falling back to the JSON export"""
+    if os.path.exists(snapshot_path):
+        return load_snapshot(snapshot_path)
+    return FeatureSnapshot.from_frame(pd.read_json(features_path).set_index("user_id"))
+
+feature_snapshot = load_features()
+feature_store = SnapshotFeatureStore(feature_snapshot)
+prediction_logger = None
 
 @app.on_event("startup")
 def load_model():
@@ -49,36 +92,99 @@ def load_model():
     except Exception as e:
         print(f"Error loading model: {e}")
         model = None
-    
+
+@app.on_event("startup")
+async def connect_backends():
+    global feature_store, prediction_logger
+    feature_store = create_feature_store(
+        settings.feature_backend, feature_snapshot, settings.redis_url,
+        settings.backend_pool_size,
+    )
+    if settings.feature_backend == "memory":
+        await feature_store.publish(feature_snapshot)
+    elif settings.feature_backend == "redis" and not await feature_store.is_published():
+        # Bootstrap an empty Redis; afterwards publish with the backends CLI
+        logger.warning("No features in Redis, publishing %s", snapshot_path)
+        await feature_store.publish(feature_snapshot)
+
+    prediction_logger = PredictionLogger(
+        create_prediction_store(settings.prediction_log_backend, settings.database_url,
+                                settings.sqlite_path, settings.backend_pool_size),
+        settings.model_version, settings.log_batch_size, settings.log_flush_interval,
+    )
+    await prediction_logger.start()
+
+@app.on_event("shutdown")
+async def close_backends():
+    global prediction_logger
+    if prediction_logger is not None:
+        await prediction_logger.close()
+        prediction_logger = None
+    await feature_store.close()
+
 @app.get("/")
 def read_root():
     return {"message": "Customer Churn Prediction API"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Expose metrics in the Prometheus text format"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+def require_debug_endpoints():
+    if not settings.enable_debug_endpoints:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+@app.get("/debug/profiling")
+def get_profiling():
+    """Current state of the sampling request profiler"""
+    require_debug_endpoints()
+    return profiler.state()
+
+@app.post("/debug/profiling")
+def set_profiling(config: ProfilingConfig):
+    """Toggle the sampling request profiler without a restart"""
+    require_debug_endpoints()
+    try:
+        profiler.configure(config.enabled, config.sample_rate, config.mode)
+    except (ValueError, ImportError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return profiler.state()
+
+@profiler.profile_thread
+def _score(rows: List[dict]):
+    """Build the feature frame and score it; run in the threadpool, off the event loop"""
+    with span("frame_construction"):
+        # The store's column order is whatever was last published
+        X = align_features(pd.DataFrame(rows), model)
+    with span("model_scoring"):
+        return churn_scores(model, X)
+
 @app.post("/predict", response_model=PredictionResponse)
-def predict_churn(request: PredictionRequest):
+@profiler.profile
+async def predict_churn(request: PredictionRequest):
     """Predict churn for a single user"""
     try:
         if model is None:
+            MODEL_CACHE.inc(result="miss")
             raise HTTPException(status_code=500, detail="Model is not loaded")
+        MODEL_CACHE.inc(result="hit")
 
-        user_features = get_user_features(request.user_id)
+        with span("feature_lookup"):
+            try:
+                user_features = await get_user_features(request.user_id)
+            except Exception:
+                logger.exception("Feature lookup failed for user %s", request.user_id)
+                raise HTTPException(status_code=503, detail="Feature store unavailable")
         if user_features is None:
             raise HTTPException(status_code=404, detail="User not found")
 
-        X = pd.DataFrame([user_features])
-        print("User features:", X.columns.tolist())
-
-        churn_prob = round(model.predict_proba(X)[0, 1], 2)
-        churn_pred = model.predict(X)[0]
+        churn_probs, churn_preds = await run_in_threadpool(_score, [user_features])
+        churn_prob, churn_pred = churn_probs[0], churn_preds[0]
+        risk_level = assign_risk_levels([churn_prob])[0]
 
-        if churn_prob < 0.3:
-            risk_level = "low"
-        elif churn_prob < 0.7:
-            risk_level = "medium"
-        else:
-            risk_level = "high"
-
-        log_prediction(request.user_id, churn_prob, churn_pred)
+        with span("logging"):
+            log_prediction(request.user_id, churn_prob, churn_pred, risk_level)
 
         return PredictionResponse(
             user_id=request.user_id,
@@ -90,29 +196,79 @@ def predict_churn(request: PredictionRequest):
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Prediction failed for user %s", request.user_id)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/batch_predict")
-def batch_predict(user_ids: List[int]):
-    """Predict churn for multiple users"""
-    predictions = []
-    for user_id in user_ids:
+@profiler.profile
+async def batch_predict(user_ids: List[int]):
+    """Predict churn for multiple users, skipping unknown ones"""
+    if model is None:
+        MODEL_CACHE.inc(result="miss")
+        return []
+    MODEL_CACHE.inc(result="hit")
+
+    with span("feature_lookup"):
         try:
-            pred = predict_churn(PredictionRequest(user_id=user_id))
-            predictions.append(pred)
-        except:
-            continue
-    return predictions
+            rows = await get_many_user_features(user_ids)
+        except Exception:
+            logger.exception("Feature lookup failed for %d users", len(user_ids))
+            raise HTTPException(status_code=503, detail="Feature store unavailable")
+    found = [(user_id, row) for user_id, row in zip(user_ids, rows) if row is not None]
+    if not found:
+        return []
+
+    try:
+        # One vectorised call for the whole batch
+        churn_probs, churn_preds = await run_in_threadpool(
+            _score, [row for _, row in found])
+    except Exception as e:
+        logger.exception("Batch prediction failed for %d users", len(found))
+        raise HTTPException(status_code=500, detail=str(e))
+    risk_levels = assign_risk_levels(churn_probs)
+
+    with span("logging"):
+        for (user_id, _), prob, pred, risk in zip(found, churn_probs, churn_preds, risk_levels):
+            log_prediction(user_id, prob, pred, risk)
+
+    return [
+        PredictionResponse(
+            user_id=user_id,
+            churn_probability=float(prob),
+            churn_prediction=bool(pred),
+            risk_level=risk,
+        )
+        for (user_id, _), prob, pred, risk in zip(found, churn_probs, churn_preds, risk_levels)
+    ]
 
 @app.post("/update_user_events")
-def update_user_events(events: List[UserEvent]):
+async def update_user_events(events: List[UserEvent]):
     """Update user events for real-time feature computation"""
     # Store events in database/cache
     # Trigger feature recomputation
     return {"message": f"Processed {len(events)} events"}
 
+@app.post("/features/reload")
+async def reload_features():
+    """Swap in the latest published feature snapshot without a restart"""
+    global feature_snapshot
+    try:
+        new_snapshot = load_features()
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=500, detail=f"Could not load features: {e}")
+    feature_snapshot = new_snapshot
+    if isinstance(feature_store, SnapshotFeatureStore):
+        feature_store.swap(new_snapshot)
+    elif settings.feature_backend == "memory":
+        await feature_store.publish(new_snapshot)
+    else:
+        # Redis is published out of process; pick up its current feature order
+        feature_store.reset()
+    return {
+        "n_users": len(feature_snapshot),
+        "built_at": feature_snapshot.header.get("built_at"),
+    }
+
 @app.get("/model/info")
 def model_info():
     """Get current model information"""
@@ -123,15 +279,22 @@ def model_info():
         "features": list(model.feature_names_in_) if hasattr(model, 'feature_names_in_') else []
     }
 
-def get_user_features(user_id: int):
+async def get_user_features(user_id: int):
     """Fetch pre-computed features for a user"""
-    # In production, this would query a feature store
-    try:
-        user_row = features_df.loc[user_id]
-        return user_row.to_dict()
-    except KeyError:
-        return None
+    user_features = await feature_store.get(user_id)
+    FEATURE_CACHE.inc(result="miss" if user_features is None else "hit")
+    return user_features
+
+async def get_many_user_features(user_ids: List[int]):
+    """Fetch pre-computed features for many users in one batched lookup"""
+    rows = await feature_store.get_many(user_ids)
+    hits = sum(row is not None for row in rows)
+    FEATURE_CACHE.inc(hits, result="hit")
+    FEATURE_CACHE.inc(len(rows) - hits, result="miss")
+    return rows
 
-def log_prediction(user_id: int, probability: float, prediction: bool):
+def log_prediction(user_id: int, probability: float, prediction: bool, risk_level: str):
     """Log predictions for monitoring"""
-    pass
\ No newline at end of file
+    # Buffered; the logger writes to its backend in bulk
+    if prediction_logger is not None:
+        prediction_logger.log(user_id, probability, prediction, risk_level)
\ No newline at end of file
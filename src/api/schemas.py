@@ -23,4 +23,9 @@ class PredictionResponse(BaseModel):
     risk_level: str  # 'low', 'medium', 'high'
     
 class UserFeatures(BaseModel):
-    features: Dict[str, float]
\ No newline at end of file
+    features: Dict[str, float]
+
+class ProfilingConfig(BaseModel):
+    enabled: bool
+    sample_rate: float = 1.0
+    mode: str = "cprofile"  # 'cprofile' or 'pyinstrument'
\ No newline at end of file
@@ -1,6 +1,43 @@
+import glob
+import hashlib
+import logging
+import os
+import tempfile
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, NamedTuple, Tuple
 
+logger = logging.getLogger(__name__)
+
+class FeatureGroup(NamedTuple):
+    func: Callable
+    columns: Tuple[str, ...]
+    version: int
+    uses_max_date: bool
+
+# Feature groups in the order create_all_features joins them
+FEATURE_GROUPS: Dict[str, FeatureGroup] = {}
+
+def feature_group(columns, version: int = 1, uses_max_date: bool = False):
+    """Register a create_*_features function with its input columns and version
+
+    Bump version whenever the function's logic changes so cached outputs
+    of the previous version are no longer used.
+    """
+    def register(func):
+        FEATURE_GROUPS[func.__name__] = FeatureGroup(func, tuple(columns), version,
+                                                     uses_max_date)
+        return func
+    return register
+
+def compute_feature_group(name: str, df: pd.DataFrame, max_date=None) -> pd.DataFrame:
+    group = FEATURE_GROUPS[name]
+    if group.uses_max_date:
+        return group.func(df, max_date)
+    return group.func(df)
+
+@feature_group(['userId', 'ts', 'sessionId', 'itemInSession'])
 def create_activity_features(df: pd.DataFrame) -> pd.DataFrame:
     """Create activity-based features"""
     features = df.groupby('userId').agg({
@@ -16,7 +53,9 @@ def create_activity_features(df: pd.DataFrame) -> pd.DataFrame:
     
     return features
 
-def create_listening_features(df: pd.DataFrame) -> pd.DataFrame:
+@feature_group(['userId', 'ts', 'song', 'length', 'artist', 'registration'],
+               uses_max_date=True)
+def create_listening_features(df: pd.DataFrame, max_date=None) -> pd.DataFrame:
     """Create music listening features"""
     songs_df = df[df['song'].notna()]
     
@@ -33,7 +72,8 @@ def create_listening_features(df: pd.DataFrame) -> pd.DataFrame:
                        'unique_artists', 'unique_songs', 'registration_date']
     
     # Additional calculations
-    max_date = df['ts'].max()
+    if max_date is None:
+        max_date = df['ts'].max()
     features['days_since_registration'] = (
         (max_date - pd.to_datetime(features['registration_date'])).dt.total_seconds() / (24 * 3600)
     )
@@ -52,6 +92,7 @@ def create_listening_features(df: pd.DataFrame) -> pd.DataFrame:
     
     return features.drop('registration_date', axis=1)
 
+@feature_group(['userId', 'page'])
 def create_engagement_features(df: pd.DataFrame) -> pd.DataFrame:
     """Create user engagement features"""
     # Engagement Features
@@ -75,6 +116,7 @@ def create_engagement_features(df: pd.DataFrame) -> pd.DataFrame:
     engagement_features = engagement_features.fillna(0)
     return engagement_features
 
+@feature_group(['userId', 'level', 'page'])
 def create_subscription_features(df: pd.DataFrame) -> pd.DataFrame:
     # Subscription Features
     latest_level = df.groupby('userId')['level'].last()
@@ -90,6 +132,7 @@ def create_subscription_features(df: pd.DataFrame) -> pd.DataFrame:
     subscription_features = subscription_features.fillna(0)
     return subscription_features
 
+@feature_group(['userId', 'page'])
 def create_issues_features(df: pd.DataFrame) -> pd.DataFrame:
     issue_features = pd.DataFrame({
         'error_count': df.query("page == 'Error'").groupby('userId').size(),
@@ -105,9 +148,11 @@ def create_issues_features(df: pd.DataFrame) -> pd.DataFrame:
 
     return issue_features
 
-def create_temporal_features(df: pd.DataFrame) -> pd.DataFrame:
+@feature_group(['userId', 'ts', 'registration'], uses_max_date=True)
+def create_temporal_features(df: pd.DataFrame, max_date=None) -> pd.DataFrame:
     last_activity = df.groupby('userId')['ts'].max()
-    max_date = df['ts'].max()
+    if max_date is None:
+        max_date = df['ts'].max()
     days_since_last_activity = (max_date - last_activity).dt.total_seconds() / (24 * 3600)
 
     user_registration = df.groupby('userId')['registration'].first()
@@ -129,6 +174,7 @@ def create_temporal_features(df: pd.DataFrame) -> pd.DataFrame:
 
     return temporal_features
 
+@feature_group(['userId', 'sessionId', 'itemInSession', 'ts'])
 def create_session_pattern_features(df: pd.DataFrame) -> pd.DataFrame:
     # Session Pattern Features
     session_lengths = df.groupby(['userId', 'sessionId'])['itemInSession'].max()
@@ -145,22 +191,151 @@ def create_session_pattern_features(df: pd.DataFrame) -> pd.DataFrame:
     session_features['session_consistency'] = 1 / (1 + session_features['session_length_std'])
     return session_features
 
-def create_all_features(df: pd.DataFrame) -> pd.DataFrame:
-    """Create all features from preprocessed data"""
-    all_users = df['userId'].dropna().unique()
-    features = pd.DataFrame(index=all_users)
-    
+def _user_index(df: pd.DataFrame) -> np.ndarray:
+    """Distinct users; integer ids are widened to int64 whatever their storage"""
+    users = df['userId'].dropna().unique()
+    if users.dtype.kind == 'i':
+        users = users.astype(np.int64)
+    return users
+
+def _combine_features(df: pd.DataFrame, group_features: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    features = pd.DataFrame(index=_user_index(df))
+
     # Add all feature groups
-    features = features.join(create_activity_features(df), how='left')
-    features = features.join(create_listening_features(df), how='left')
-    features = features.join(create_engagement_features(df), how='left')
-    features = features.join(create_subscription_features(df), how='left')
-    features = features.join(create_issues_features(df), how='left')
-    features = features.join(create_temporal_features(df), how='left')
-    features = features.join(create_session_pattern_features(df), how='left')
+    for part in group_features:
+        features = features.join(part, how='left')
 
     # Add target variable
     churned_users = df.query("page == 'Cancellation Confirmation'")['userId'].unique()
     features['is_churned'] = features.index.isin(churned_users).astype(int)
 
-    return features.fillna(0)
\ No newline at end of file
+    return features.fillna(0)
+
+def create_all_features(df: pd.DataFrame, max_date=None) -> pd.DataFrame:
+    """Create all features from preprocessed data
+
+    max_date is the reference date for recency features and defaults to the
+    latest event in df. Pass the global value when df is a subset of users.
+    """
+    return _combine_features(
+        df, (compute_feature_group(name, df, max_date) for name in FEATURE_GROUPS)
+    )
+
+def create_demographic_features(df: pd.DataFrame, states=None,
+                                genders=('F', 'M')) -> pd.DataFrame:
+    """One-hot gender and state columns, encoded as in the notebook export
+
+    States outside `states` (default: the three with the most users) are
+    grouped as 'Other'. Pass the trained model's states when scoring new data
+    so the columns match; this is why demographics are not a registered
+    feature group. Columns are bool, like the JSON export.
+    """
+    demographics = (df.groupby('userId')[['gender', 'state']].first()
+                    .astype(object).fillna('Unknown'))
+    if states is None:
+        states = demographics['state'].value_counts().head(3).index.tolist()
+    grouped = demographics['state'].where(demographics['state'].isin(states), 'Other')
+
+    gender = pd.get_dummies(demographics['gender'], prefix='gender')
+    gender = gender.reindex(columns=sorted(set(gender.columns)
+                                           | {f'gender_{g}' for g in genders}),
+                            fill_value=False)
+    state = pd.get_dummies(grouped, prefix='state').reindex(
+        columns=[f'state_{name}' for name in sorted([*states, 'Other'])], fill_value=False)
+    return pd.concat([gender, state], axis=1)
+
+def _column_digest(series: pd.Series) -> str:
+    hashes = pd.util.hash_pandas_object(series, index=False).to_numpy()
+    return hashlib.sha1(hashes.tobytes()).hexdigest()
+
+def create_all_features_cached(df: pd.DataFrame, cache_dir: str, max_date=None,
+                               refresh: Iterable[str] = ()) -> pd.DataFrame:
+    """Create all features, reusing each group's cached output when valid
+
+    A group's output is stored in cache_dir under a key made of the group
+    name, its version and a fingerprint of its input columns (plus max_date
+    if it uses one). Only groups whose key changed, or that are listed in
+    refresh, are recomputed. The result equals create_all_features(df).
+
+    Writing a group's new key deletes its older keys, so cache_dir holds one
+    file per group. The names of recomputed groups are logged at INFO with
+    a 'recomputed' attribute on the log record.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    refresh = set(refresh)
+    unknown = refresh - set(FEATURE_GROUPS)
+    if unknown:
+        raise ValueError(f"Unknown feature groups: {sorted(unknown)}")
+
+    digests = {}
+    parts = []
+    recomputed = []
+    for name, group in FEATURE_GROUPS.items():
+        key = hashlib.sha1(f"{name}:{group.version}".encode())
+        for col in group.columns:
+            if col not in digests:
+                digests[col] = _column_digest(df[col])
+            key.update(digests[col].encode())
+        if group.uses_max_date and max_date is not None:
+            key.update(str(pd.Timestamp(max_date)).encode())
+        path = os.path.join(cache_dir, f"{name}-v{group.version}-{key.hexdigest()[:16]}.parquet")
+
+        if name not in refresh and os.path.exists(path):
+            parts.append(pd.read_parquet(path))
+            continue
+        part = compute_feature_group(name, df, max_date)
+        tmp_path = f"{path}.tmp"
+        part.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+        for stale in glob.glob(os.path.join(cache_dir, f"{name}-v*.parquet")):
+            if stale != path:
+                os.remove(stale)
+        parts.append(part)
+        recomputed.append(name)
+
+    logger.info("Feature groups recomputed: %s", recomputed or 'none',
+                extra={'recomputed': recomputed})
+    return _combine_features(df, parts)
+
+def _features_for_partition(path: str, max_date) -> pd.DataFrame:
+    return create_all_features(pd.read_parquet(path), max_date)
+
+def create_all_features_partitioned(df: pd.DataFrame, n_partitions: int = None,
+                                    workers: int = None,
+                                    partition_dir: str = None) -> pd.DataFrame:
+    """Create all features on userId hash partitions in a process pool
+
+    Every feature is per user, so each partition is processed independently
+    with the global max_date broadcast to it. Partitions are written as
+    Parquet files (to partition_dir, or a temporary directory) that the
+    workers read, so events are not pickled through the pool. The result
+    equals create_all_features(df).
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if n_partitions is None:
+        n_partitions = workers
+
+    # Reference date from every event, as create_all_features does
+    max_date = df['ts'].max()
+    df = df[df['userId'].notna()]
+    if df.empty:
+        raise ValueError("No events with a userId to build features from")
+    all_users = _user_index(df)
+    partition = pd.util.hash_array(df['userId'].to_numpy()) % n_partitions
+
+    with tempfile.TemporaryDirectory(dir=partition_dir) as tmp_dir:
+        paths = []
+        for i, part in df.groupby(partition, sort=False):
+            path = os.path.join(tmp_dir, f'partition_{i:04d}.parquet')
+            part.to_parquet(path, index=False)
+            paths.append(path)
+
+        if workers <= 1:
+            results = [_features_for_partition(path, max_date) for path in paths]
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+                results = list(pool.map(_features_for_partition, paths,
+                                        [max_date] * len(paths)))
+
+    return pd.concat(results).reindex(all_users)
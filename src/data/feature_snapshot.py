@@ -0,0 +1,203 @@
+"""Versioned binary snapshot of the user feature table
+
+Layout (little endian):
+    8 bytes   magic b"CHURNFS1"
+    8 bytes   uint64 header length
+    n bytes   UTF-8 JSON header: schema_version, built_at, feature_names
+              (model order), dtypes, n_users
+    padding   to a 64 byte boundary
+    int64     sorted userIds, n_users values
+    padding   to a 64 byte boundary
+    float32   feature matrix, column by column (n_features x n_users)
+
+Snapshots are published atomically (written to a temp file, then renamed over
+the target) so a reader never sees a partial file, and loaded with mmap so
+opening one costs no parsing or copying.
+
+The notebook export (notebooks/validate_full_data.ipynb) writes the snapshot
+next to user_features.json. Any other export must be converted by hand.
+
+Usage:
+    python -m src.data.feature_snapshot --features src/data/user_features.json \\
+        --model models/lg_churn.pkl --output src/data/user_features.snap
+    python -m src.data.feature_snapshot --events data/events.json \\
+        --model models/lg_churn.pkl --output src/data/user_features.snap
+"""
+import argparse
+import json
+import os
+import struct
+import tempfile
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b"CHURNFS1"
+SCHEMA_VERSION = 1
+ALIGNMENT = 64
+_PREAMBLE = struct.Struct("<8sQ")
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+class FeatureSnapshot:
+    """Read-only feature table backed by a sorted userId array and a float32 matrix"""
+
+    def __init__(self, user_ids: np.ndarray, matrix: np.ndarray,
+                 feature_names: List[str], header: Optional[Dict] = None):
+        self.user_ids = user_ids
+        self.matrix = matrix  # shape (n_features, n_users)
+        self.feature_names = list(feature_names)
+        self.header = header or {}
+
+    @classmethod
+    def from_frame(cls, features: pd.DataFrame,
+                   feature_names: Optional[List[str]] = None) -> "FeatureSnapshot":
+        """Build an in-memory snapshot from a frame indexed by userId"""
+        if feature_names is None:
+            feature_names = list(features.columns)
+        features = features.sort_index()
+        user_ids = features.index.to_numpy(dtype=np.int64)
+        matrix = np.ascontiguousarray(
+            features[feature_names].to_numpy(dtype=np.float32).T
+        )
+        header = {
+            "schema_version": SCHEMA_VERSION,
+            "built_at": datetime.now(timezone.utc).isoformat(),
+            "n_users": len(user_ids),
+            "feature_names": list(feature_names),
+            "dtypes": {name: str(features[name].dtype) for name in feature_names},
+        }
+        return cls(user_ids, matrix, feature_names, header)
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def __contains__(self, user_id) -> bool:
+        return self._position(user_id) is not None
+
+    def _position(self, user_id) -> Optional[int]:
+        pos = int(np.searchsorted(self.user_ids, user_id))
+        if pos < len(self.user_ids) and self.user_ids[pos] == user_id:
+            return pos
+        return None
+
+    def get(self, user_id) -> Optional[Dict[str, float]]:
+        """Features of one user as a dict in model order, or None if unknown"""
+        pos = self._position(user_id)
+        if pos is None:
+            return None
+        return dict(zip(self.feature_names, self.matrix[:, pos].tolist()))
+
+    def to_frame(self) -> pd.DataFrame:
+        """Materialise the snapshot as a frame, restoring the original dtypes"""
+        df = pd.DataFrame(self.matrix.T, columns=self.feature_names,
+                          index=pd.Index(self.user_ids, name="user_id"))
+        dtypes = self.header.get("dtypes", {})
+        return df.astype({name: dtypes[name] for name in self.feature_names
+                          if name in dtypes})
+
+
+def write_snapshot(features: pd.DataFrame, path: str,
+                   feature_names: Optional[List[str]] = None) -> FeatureSnapshot:
+    """Write features to path, publishing it atomically with a rename"""
+    snapshot = FeatureSnapshot.from_frame(features, feature_names)
+    header = json.dumps(snapshot.header).encode("utf-8")
+    ids_offset = _align(_PREAMBLE.size + len(header))
+    matrix_offset = _align(ids_offset + snapshot.user_ids.nbytes)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_PREAMBLE.pack(MAGIC, len(header)))
+            f.write(header)
+            f.write(b"\0" * (ids_offset - f.tell()))
+            f.write(snapshot.user_ids.astype("<i8").tobytes())
+            f.write(b"\0" * (matrix_offset - f.tell()))
+            f.write(snapshot.matrix.astype("<f4").tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return snapshot
+
+
+def load_snapshot(path: str, mmap: bool = True) -> FeatureSnapshot:
+    """Load a snapshot, memory-mapped (zero-copy) unless mmap=False"""
+    with open(path, "rb") as f:
+        preamble = f.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size or not preamble.startswith(MAGIC):
+            raise ValueError(f"{path} is not a feature snapshot")
+        _, header_len = _PREAMBLE.unpack(preamble)
+        header = json.loads(f.read(header_len))
+
+    if header.get("schema_version") != SCHEMA_VERSION:
+        raise ValueError(
+            f"Unsupported snapshot schema version {header.get('schema_version')}, "
+            f"expected {SCHEMA_VERSION}"
+        )
+
+    n_users = header["n_users"]
+    n_features = len(header["feature_names"])
+    ids_offset = _align(_PREAMBLE.size + header_len)
+    matrix_offset = _align(ids_offset + n_users * 8)
+
+    if mmap:
+        user_ids = np.memmap(path, dtype="<i8", mode="r", offset=ids_offset,
+                             shape=(n_users,))
+        matrix = np.memmap(path, dtype="<f4", mode="r", offset=matrix_offset,
+                           shape=(n_features, n_users))
+    else:
+        with open(path, "rb") as f:
+            f.seek(ids_offset)
+            user_ids = np.fromfile(f, dtype="<i8", count=n_users)
+            f.seek(matrix_offset)
+            matrix = np.fromfile(f, dtype="<f4", count=n_features * n_users)
+        matrix = matrix.reshape(n_features, n_users)
+
+    return FeatureSnapshot(user_ids, matrix, header["feature_names"], header)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a binary feature snapshot")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--features",
+                        help="feature table (json, csv or parquet) with a user_id column")
+    source.add_argument("--events", help="raw event log to compute features from")
+    parser.add_argument("--model", help="model whose feature order to use")
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args()
+    if args.events and not args.model:
+        parser.error("--events needs --model to encode states and order features")
+
+    from ..models.predict import (
+        align_features, compute_feature_table, load_feature_table, model_states,
+    )
+
+    model = None
+    if args.model:
+        import joblib
+
+        model = joblib.load(args.model)
+    if args.events:
+        features = compute_feature_table(args.events, model_states(model))
+    else:
+        features = load_feature_table(args.features)
+    if model is not None:
+        features = align_features(features, model)
+    snapshot = write_snapshot(features, args.output)
+    print(f"Wrote {len(snapshot):,} users x {len(snapshot.feature_names)} features "
+          f"to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
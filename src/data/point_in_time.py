@@ -0,0 +1,242 @@
+import numpy as np
+import pandas as pd
+from typing import Sequence
+
+DAY_SECONDS = 24 * 3600
+
+# Page counters kept as running totals, and the feature each one becomes
+PAGE_COUNTERS = {
+    'Thumbs Up': 'thumbs_up',
+    'Thumbs Down': 'thumbs_down',
+    'Add to Playlist': 'playlist_adds',
+    'Add Friend': 'add_friend',
+    'Roll Advert': 'advert_roll',
+    'Submit Downgrade': 'downgrades',
+    'Submit Upgrade': 'upgrades',
+    'Error': 'error_count',
+    'Help': 'help_visits',
+    'Settings': 'settings_visits',
+    'Logout': 'logout_count',
+    'Cancellation Confirmation': 'cancellations',
+}
+
+FEATURE_COLUMNS = [
+    'total_events', 'num_sessions', 'total_interactions', 'events_per_session',
+    'songs_played', 'total_listening_time', 'avg_song_length', 'unique_artists',
+    'unique_songs', 'days_since_registration', 'avg_daily_listening_time',
+    'avg_daily_songs', 'artist_diversity',
+    'thumbs_up', 'thumbs_down', 'total_feedback', 'positive_feedback_ratio',
+    'playlist_adds', 'add_friend', 'advert_roll',
+    'is_paid', 'subscription_changes', 'downgrades', 'upgrades',
+    'error_count', 'help_visits', 'settings_visits', 'logout_count', 'has_issues',
+    'days_since_last_activity', 'days_used_in_period', 'days_available_in_period',
+    'usage_frequency',
+    'avg_session_length', 'session_length_std', 'max_session_length',
+    'avg_session_duration_mins', 'session_duration_std_mins',
+    'max_session_duration_mins', 'session_consistency',
+]
+
+
+def _first_seen(df: pd.DataFrame, cols, mask=None) -> np.ndarray:
+    """1 on the first row of each (userId, *cols) combination, else 0"""
+    first = ~df.duplicated(['userId'] + cols)
+    if mask is not None:
+        first &= mask
+    return first.to_numpy(dtype=np.int64)
+
+
+def _first_value_so_far(df: pd.DataFrame, col: str, mask=None) -> pd.Series:
+    """The user's first non-null value of col, from the row it appears on"""
+    valid = df[col].notna()
+    if mask is not None:
+        valid &= mask
+    seen = valid.groupby(df['userId']).cumsum() > 0
+    first = df[col].where(valid).groupby(df['userId']).transform('first')
+    return first.where(seen)
+
+
+def _running_state(df: pd.DataFrame) -> pd.DataFrame:
+    """Cumulative per-user aggregates after each event of a (userId, ts) sorted log"""
+    user = df['userId']
+    is_song = df['song'].notna()
+    session_keys = [user, df['sessionId']]
+
+    counters = pd.DataFrame({
+        'total_events': 1,
+        'num_sessions': _first_seen(df, ['sessionId']),
+        'total_interactions': df['itemInSession'],
+        'songs_played': is_song.astype(np.int64),
+        'total_listening_time': df['length'].where(is_song, 0).fillna(0),
+        'song_lengths': (is_song & df['length'].notna()).astype(np.int64),
+        'unique_artists': _first_seen(df, ['artist'], is_song & df['artist'].notna()),
+        'unique_songs': _first_seen(df, ['song'], is_song),
+        'subscription_levels': _first_seen(df, ['level'], df['level'].notna()),
+        'days_used_in_period': _first_seen(df.assign(date=df['ts'].dt.date), ['date']),
+    }, index=df.index)
+    for page, name in PAGE_COUNTERS.items():
+        counters[name] = (df['page'] == page).astype(np.int64)
+
+    # Session length and duration change as a session grows; accumulate the
+    # change in each session's value so the per-user sums stay current
+    session_length = df['itemInSession'].groupby(session_keys).cummax()
+    session_start = df['ts'].groupby(session_keys).cummin()
+    session_duration = (df['ts'] - session_start).dt.total_seconds() / 60
+    for name, value in [('length', session_length), ('duration', session_duration)]:
+        previous = value.groupby(session_keys).shift(1).fillna(0)
+        counters[f'session_{name}_sum'] = value - previous
+        counters[f'session_{name}_sq'] = value ** 2 - previous ** 2
+
+    state = counters.groupby(user).cumsum()
+    state['userId'] = user
+    state['ts'] = df['ts']
+    state['max_session_length'] = session_length.groupby(user).cummax()
+    state['max_session_duration_mins'] = session_duration.groupby(user).cummax()
+    state['level'] = df['level'].groupby(user).ffill()
+    state['registration'] = _first_value_so_far(df, 'registration')
+    state['song_registration'] = _first_value_so_far(df, 'registration', is_song)
+    return state
+
+
+def _session_stats(state: pd.DataFrame, name: str):
+    n = state['num_sessions']
+    total = state[f'session_{name}_sum']
+    mean = total / n
+    variance = ((state[f'session_{name}_sq'] - total * mean) / (n - 1)).clip(lower=0)
+    std = np.sqrt(variance).where(n > 1, 0)
+    return mean, std
+
+
+def _derive_features(state: pd.DataFrame, reference: pd.Series) -> pd.DataFrame:
+    """Turn running totals into the features produced by create_all_features"""
+    features = pd.DataFrame(index=state.index)
+    for col in ['total_events', 'num_sessions', 'total_interactions']:
+        features[col] = state[col]
+    features['events_per_session'] = state['total_events'] / state['num_sessions']
+
+    # Listening features exist only for users who have played a song
+    songs = state['songs_played']
+    days_since_registration = (
+        (reference - state['song_registration']).dt.total_seconds() / DAY_SECONDS
+    )
+    listening = pd.DataFrame({
+        'songs_played': songs,
+        'total_listening_time': state['total_listening_time'],
+        'avg_song_length': state['total_listening_time'] / state['song_lengths'],
+        'unique_artists': state['unique_artists'],
+        'unique_songs': state['unique_songs'],
+        'days_since_registration': days_since_registration,
+        'avg_daily_listening_time': (
+            state['total_listening_time'] / days_since_registration).fillna(0),
+        'avg_daily_songs': (songs / days_since_registration).fillna(0),
+        'artist_diversity': (state['unique_artists'] / songs).fillna(0),
+    })
+    features = features.join(listening.where(songs > 0, 0))
+
+    # Engagement features exist only for users who have given feedback
+    total_feedback = state['thumbs_up'] + state['thumbs_down']
+    engagement = pd.DataFrame({
+        'thumbs_up': state['thumbs_up'],
+        'thumbs_down': state['thumbs_down'],
+        'total_feedback': total_feedback,
+        'positive_feedback_ratio': state['thumbs_up'] / total_feedback,
+        'playlist_adds': state['playlist_adds'],
+        'add_friend': state['add_friend'],
+        'advert_roll': state['advert_roll'],
+    })
+    features = features.join(engagement.where(total_feedback > 0, 0))
+
+    features['is_paid'] = (state['level'] == 'paid').astype(int)
+    features['subscription_changes'] = (state['subscription_levels'] > 1).astype(int)
+    for col in ['downgrades', 'upgrades', 'error_count', 'help_visits',
+                'settings_visits', 'logout_count']:
+        features[col] = state[col]
+    features['has_issues'] = (
+        (state['error_count'] > 0) | (state['help_visits'] > 0)
+    ).astype(int)
+
+    features['days_since_last_activity'] = (
+        (reference - state['ts']).dt.total_seconds() / DAY_SECONDS
+    )
+    features['days_used_in_period'] = state['days_used_in_period']
+    days_available = (
+        reference.dt.normalize() - state['registration'].dt.normalize()
+    ).dt.days + 1
+    features['days_available_in_period'] = days_available
+    features['usage_frequency'] = state['days_used_in_period'] / days_available
+
+    mean, std = _session_stats(state, 'length')
+    features['avg_session_length'] = mean
+    features['session_length_std'] = std
+    features['max_session_length'] = state['max_session_length']
+    mean, std = _session_stats(state, 'duration')
+    features['avg_session_duration_mins'] = mean
+    features['session_duration_std_mins'] = std
+    features['max_session_duration_mins'] = state['max_session_duration_mins']
+    features['session_consistency'] = 1 / (1 + features['session_length_std'])
+
+    return features[FEATURE_COLUMNS].fillna(0)
+
+
+def create_point_in_time_features(df: pd.DataFrame, cutoffs: Sequence,
+                                  label_horizon='30D',
+                                  include_churned: bool = False) -> pd.DataFrame:
+    """Create features and churn labels for every cutoff in one pass
+
+    Features at a cutoff only use events with ts <= cutoff, with the latest
+    such event as the reference date, so they equal create_all_features on
+    the log truncated at that cutoff. The label is 1 when the user reaches
+    Cancellation Confirmation in (cutoff, cutoff + label_horizon]. Users who
+    cancelled at or before a cutoff are left out of it unless include_churned.
+
+    Returns one row per (cutoff, userId) with a two-level index.
+    """
+    cutoffs = pd.DatetimeIndex(pd.to_datetime(cutoffs)).sort_values().unique()
+    label_horizon = pd.Timedelta(label_horizon)
+
+    df = df.sort_values(['userId', 'ts'], kind='stable').reset_index(drop=True)
+    state = _running_state(df)
+
+    # Keep the last state of each user within each cutoff bucket, then
+    # repeat it for every later cutoff until the user's next bucket
+    bucket = np.searchsorted(cutoffs.values, df['ts'].values, side='left')
+    user = df['userId'].to_numpy()
+    is_last = np.r_[(user[1:] != user[:-1]) | (bucket[1:] != bucket[:-1]), True]
+    is_last &= bucket < len(cutoffs)
+    state, bucket, user = state[is_last], bucket[is_last], user[is_last]
+
+    next_bucket = np.r_[bucket[1:], len(cutoffs)]
+    next_bucket[np.r_[user[1:] != user[:-1], True]] = len(cutoffs)
+    repeats = next_bucket - bucket
+    positions = np.repeat(np.arange(len(state)), repeats)
+    cutoff_idx = (np.arange(repeats.sum())
+                  - np.repeat(np.cumsum(repeats) - repeats, repeats)
+                  + np.repeat(bucket, repeats))
+    state = state.iloc[positions].reset_index(drop=True)
+
+    # Reference date per cutoff: the latest event at or before it
+    ts_sorted = np.sort(df['ts'].values)
+    last_event = np.searchsorted(ts_sorted, cutoffs.values, side='right') - 1
+    reference = pd.Series(ts_sorted[last_event][cutoff_idx], index=state.index)
+
+    features = _derive_features(state, reference)
+    features.index = pd.MultiIndex.from_arrays(
+        [cutoffs[cutoff_idx], state['userId']], names=['cutoff', 'userId']
+    )
+
+    # Each cancellation labels the cutoffs c with ts - horizon <= c < ts
+    cancels = df.loc[df['page'] == 'Cancellation Confirmation', ['userId', 'ts']]
+    first = np.searchsorted(cutoffs.values, (cancels['ts'] - label_horizon).values,
+                            side='left')
+    last = np.searchsorted(cutoffs.values, cancels['ts'].values, side='left')
+    counts = last - first
+    labelled = pd.MultiIndex.from_arrays([
+        cutoffs[np.repeat(first, counts)
+                + np.arange(counts.sum())
+                - np.repeat(np.cumsum(counts) - counts, counts)],
+        np.repeat(cancels['userId'].to_numpy(), counts),
+    ])
+    features['is_churned'] = features.index.isin(labelled).astype(int)
+
+    if not include_churned:
+        features = features[state['cancellations'].to_numpy() == 0]
+    return features.sort_index()
@@ -1,25 +1,58 @@
 import pandas as pd
 import numpy as np
+from contextlib import nullcontext
 from typing import Tuple
 
+# Repeated strings, stored as categoricals in low-memory mode
+CATEGORICAL_COLUMNS = ['userId', 'page', 'auth', 'method', 'level', 'location',
+                       'userAgent', 'firstName', 'lastName', 'gender', 'artist', 'song']
+# Only used as group keys, so a narrower int never changes a feature.
+# itemInSession stays int64: it is summed per user.
+INT32_COLUMNS = ['sessionId', 'status']
+
 def load_data(filepath: str) -> pd.DataFrame:
     """Load data from JSON file"""
     return pd.read_json(filepath, lines=True)
 
-def convert_timestamps(df: pd.DataFrame) -> pd.DataFrame:
+def optimize_dtypes(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
+    """Store repeated strings as categoricals and downcast integer ids"""
+    if copy:
+        df = df.copy()
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and df[col].dtype == object:
+            df[col] = df[col].astype('category')
+    for col in INT32_COLUMNS:
+        if col in df.columns and pd.api.types.is_integer_dtype(df[col]) \
+                and _fits_int32(df[col]):
+            df[col] = df[col].astype(np.int32)
+    return df
+
+def _fits_int32(series: pd.Series) -> bool:
+    info = np.iinfo(np.int32)
+    return series.empty or (series.min() >= info.min and series.max() <= info.max)
+
+def convert_timestamps(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
     """Convert timestamp columns to datetime"""
-    df = df.copy()
+    if copy:
+        df = df.copy()
     df['ts'] = pd.to_datetime(df['ts'], unit='ms')
     df['registration'] = pd.to_datetime(df['registration'], unit='ms')
     return df
 
-def clean_user_ids(df: pd.DataFrame) -> pd.DataFrame:
+def clean_user_ids(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
     """Clean and convert user IDs"""
-    df = df.copy()
+    if copy:
+        df = df.copy()
+    if isinstance(df['userId'].dtype, pd.CategoricalDtype):
+        # Parse each distinct id once, then expand by category code
+        ids = pd.to_numeric(df['userId'].cat.categories.to_series(), errors='coerce')
+        codes = df['userId'].cat.codes.to_numpy()
+        df['userId'] = np.where(codes >= 0, ids.to_numpy(dtype=float)[codes], np.nan)
+        return df
     df['userId'] = pd.to_numeric(df['userId'], errors='coerce')
     return df
 
-def impute_missing_userids(df: pd.DataFrame) -> pd.DataFrame:
+def impute_missing_userids(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
     """Impute missing user IDs using session logic"""
 
     def is_valid_sequence_assignment(user_items_array, item):
@@ -42,7 +75,8 @@ def impute_missing_userids(df: pd.DataFrame) -> pd.DataFrame:
     
     def map_user_attributes(df):
         """Map user attributes based on imputed userId."""
-        df = df.copy()
+        if copy:
+            df = df.copy()
         user_cols = ['location', 'userAgent', 'lastName', 'firstName', 'registration', 'gender']
         
         user_map = df[df['userId'].notna()].groupby('userId')[user_cols].first()
@@ -52,7 +86,8 @@ def impute_missing_userids(df: pd.DataFrame) -> pd.DataFrame:
         
         return df
 
-    df = df.copy()
+    if copy:
+        df = df.copy()
     df['imputed'] = False
     df['ts'] = pd.to_datetime(df['ts'])
     
@@ -155,19 +190,51 @@ def impute_missing_userids(df: pd.DataFrame) -> pd.DataFrame:
     df = map_user_attributes(df)
     return df
 
-def create_location_features(df: pd.DataFrame) -> pd.DataFrame:
+def create_location_features(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
     """Extract city and state from location"""
-    df = df.copy()
+    if copy:
+        df = df.copy()
+    if isinstance(df['location'].dtype, pd.CategoricalDtype):
+        # Split each distinct location once instead of every row
+        locations = df['location'].cat.categories.to_series()
+        df['city'] = df['location'].map(locations.str.split(',').str[0]).astype('category')
+        df['state'] = df['location'].map(
+            locations.str.split(',').str[1].str.strip()).astype('category')
+        return df
     df['city'] = df['location'].str.split(',').str[0]
     df['state'] = df['location'].str.split(',').str[1].str.strip()
     return df
 
-def preprocess_pipeline(df: pd.DataFrame) -> pd.DataFrame:
-    """Complete preprocessing pipeline"""
-    df = convert_timestamps(df)
-    df = clean_user_ids(df)
-    df = impute_missing_userids(df)
-    df = create_location_features(df)
-    df = df.dropna(subset=['userId']).reset_index(drop=True)
-    df['userId'] = df['userId'].astype(int)
+def _untracked(name: str):
+    return nullcontext()
+
+def preprocess_pipeline(df: pd.DataFrame, low_memory: bool = False,
+                        memory_tracker=None) -> pd.DataFrame:
+    """Complete preprocessing pipeline
+
+    With low_memory=True the input frame is modified in place rather than
+    copied by every step, repeated strings become categoricals and integer
+    ids (sessionId, status and the final userId) are downcast to int32 when
+    they fit. The features computed from the result are unchanged.
+    Pass a MemoryTracker to record the peak memory of each stage.
+    """
+    copy = not low_memory
+    stage = memory_tracker.track if memory_tracker is not None else _untracked
+
+    if low_memory:
+        with stage('optimize_dtypes'):
+            df = optimize_dtypes(df, copy=False)
+    with stage('convert_timestamps'):
+        df = convert_timestamps(df, copy=copy)
+    with stage('clean_user_ids'):
+        df = clean_user_ids(df, copy=copy)
+    with stage('impute_missing_userids'):
+        df = impute_missing_userids(df, copy=copy)
+    with stage('create_location_features'):
+        df = create_location_features(df, copy=copy)
+    with stage('drop_missing_userids'):
+        df = df.dropna(subset=['userId']).reset_index(drop=True)
+        df['userId'] = df['userId'].astype(int)
+        if low_memory and _fits_int32(df['userId']):
+            df['userId'] = df['userId'].astype(np.int32)
     return df
\ No newline at end of file
@@ -0,0 +1,256 @@
+"""Offline bulk scoring of the whole user base
+
+Usage:
+    python -m src.models.predict --features src/data/user_features.json \\
+        --output predictions/ --workers 8
+    python -m src.models.predict --events data/events.json --output predictions/
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+RISK_THRESHOLDS = (0.3, 0.7)
+RISK_LEVELS = np.array(['low', 'medium', 'high'], dtype=object)
+
+_worker_model = None
+
+
+def assign_risk_levels(probabilities) -> np.ndarray:
+    """Map churn probabilities to 'low', 'medium' or 'high' risk"""
+    return RISK_LEVELS[np.searchsorted(RISK_THRESHOLDS, probabilities, side='right')]
+
+
+def load_feature_table(path: str) -> pd.DataFrame:
+    """Load a pre-computed feature table indexed by user id"""
+    if path.endswith('.snap'):
+        from ..data.feature_snapshot import load_snapshot
+
+        return load_snapshot(path).to_frame()
+    if path.endswith('.parquet'):
+        df = pd.read_parquet(path)
+    elif path.endswith('.csv'):
+        df = pd.read_csv(path)
+    else:
+        df = pd.read_json(path)
+    if 'user_id' in df.columns:
+        df = df.set_index('user_id')
+    return df
+
+
+def model_states(model) -> Optional[List[str]]:
+    """States the model has one-hot columns for, besides 'Other'"""
+    if not hasattr(model, 'feature_names_in_'):
+        return None
+    return [col[len('state_'):] for col in model.feature_names_in_
+            if col.startswith('state_') and col != 'state_Other']
+
+
+def compute_feature_table(events_path: str, states=None) -> pd.DataFrame:
+    """Recompute the feature table from a raw event log
+
+    states are the model's state columns (see model_states); by default the
+    three states with the most users, as in the notebook export.
+    """
+    from ..data.feature_engineering import create_all_features, create_demographic_features
+    from ..data.preprocessing import load_data, preprocess_pipeline
+
+    df = preprocess_pipeline(load_data(events_path))
+    features = create_all_features(df).drop(columns='is_churned')
+    return create_demographic_features(df, states).join(features)
+
+
+def align_features(features: pd.DataFrame, model) -> pd.DataFrame:
+    """Select the model's input columns in training order"""
+    if not hasattr(model, 'feature_names_in_'):
+        return features
+    expected = list(model.feature_names_in_)
+    missing = [col for col in expected if col not in features.columns]
+    if missing:
+        raise ValueError(f"Feature table is missing model features: {missing}")
+    return features[expected]
+
+
+def churn_scores(model, X: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """Churn probability rounded to 2 dp and predicted class, one predict_proba call
+
+    Shared by the API and the bulk job so a user gets the same probability,
+    and therefore the same risk level, online and offline.
+    """
+    proba = model.predict_proba(X)
+    churn_probability = proba[:, list(model.classes_).index(1)].round(2)
+    return churn_probability, model.classes_[proba.argmax(axis=1)].astype(bool)
+
+
+def score_frame(model, X: pd.DataFrame) -> pd.DataFrame:
+    """Score a feature frame, one predict_proba call for the whole frame"""
+    churn_probability, churn_prediction = churn_scores(model, X)
+    return pd.DataFrame({
+        'user_id': X.index.to_numpy(),
+        'churn_probability': churn_probability,
+        'churn_prediction': churn_prediction,
+        'risk_level': assign_risk_levels(churn_probability),
+    })
+
+
+def _init_worker(model_path: str):
+    global _worker_model
+    _worker_model = joblib.load(model_path)
+
+
+def _score_chunk(chunk_path: str, X: pd.DataFrame, output_format: str) -> str:
+    result = score_frame(_worker_model, X)
+    write_frame(result, chunk_path, output_format)
+    return chunk_path
+
+
+def write_frame(df: pd.DataFrame, path: str, output_format: str):
+    """Write df to path atomically (write a temp file, then rename)"""
+    tmp_path = f"{path}.tmp"
+    if output_format == 'parquet':
+        df.to_parquet(tmp_path, index=False)
+    else:
+        df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def read_frame(path: str, output_format: str) -> pd.DataFrame:
+    if output_format == 'parquet':
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def fingerprint_features(X: pd.DataFrame) -> str:
+    """SHA1 of a feature frame's columns, index and values"""
+    digest = hashlib.sha1(json.dumps([str(col) for col in X.columns]).encode())
+    digest.update(pd.util.hash_pandas_object(X, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _check_manifest(output_dir: str, manifest: dict):
+    """Refuse to resume checkpoints written with a different configuration"""
+    path = os.path.join(output_dir, 'manifest.json')
+    if os.path.exists(path):
+        with open(path) as f:
+            existing = json.load(f)
+        if existing != manifest:
+            raise ValueError(
+                f"Checkpoints in {output_dir} were written with {existing}, "
+                f"not {manifest}. Use a new output directory or delete it."
+            )
+    else:
+        with open(path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+
+def bulk_score(features: pd.DataFrame, model_path: str, output_dir: str,
+               chunk_size: int = 100000, workers: Optional[int] = None,
+               output_format: str = 'parquet') -> pd.DataFrame:
+    """Score every user in chunks, checkpointing each chunk to output_dir
+
+    Chunks already present in output_dir/chunks are reused, so a failed or
+    interrupted run resumes where it stopped. Failed chunks are reported and
+    raise a RuntimeError once the remaining chunks have been scored.
+    """
+    if output_format not in ('parquet', 'csv'):
+        raise ValueError(f"Unsupported output format: {output_format}")
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    model = joblib.load(model_path)
+    X = align_features(features, model)
+
+    chunk_dir = os.path.join(output_dir, 'chunks')
+    os.makedirs(chunk_dir, exist_ok=True)
+    _check_manifest(output_dir, {
+        'n_users': len(X),
+        'features_sha1': fingerprint_features(X),
+        'chunk_size': chunk_size,
+        'model_path': os.path.abspath(model_path),
+        'model_mtime': os.path.getmtime(model_path),
+        'format': output_format,
+    })
+
+    n_chunks = max(1, -(-len(X) // chunk_size))
+    chunk_paths = [os.path.join(chunk_dir, f"chunk_{i:05d}.{output_format}")
+                   for i in range(n_chunks)]
+    pending = [i for i, path in enumerate(chunk_paths) if not os.path.exists(path)]
+    print(f"Scoring {len(X):,} users in {n_chunks} chunks "
+          f"({n_chunks - len(pending)} already done)")
+
+    failed = []
+    if workers <= 1 or len(pending) <= 1:
+        for i in pending:
+            chunk = X.iloc[i * chunk_size:(i + 1) * chunk_size]
+            try:
+                write_frame(score_frame(model, chunk), chunk_paths[i], output_format)
+            except Exception as e:
+                print(f"Chunk {i} failed: {e!r}", file=sys.stderr)
+                failed.append(i)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(model_path,)) as pool:
+            futures = {
+                pool.submit(_score_chunk, chunk_paths[i],
+                            X.iloc[i * chunk_size:(i + 1) * chunk_size],
+                            output_format): i
+                for i in pending
+            }
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"Chunk {futures[future]} failed: {e!r}", file=sys.stderr)
+                    failed.append(futures[future])
+
+    if failed:
+        raise RuntimeError(
+            f"{len(failed)} of {n_chunks} chunks failed: {sorted(failed)}. "
+            f"Re-run with the same output directory to resume."
+        )
+
+    predictions = pd.concat(
+        [read_frame(path, output_format) for path in chunk_paths], ignore_index=True
+    )
+    write_frame(predictions, os.path.join(output_dir, f"predictions.{output_format}"),
+                output_format)
+    return predictions
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Offline bulk churn scoring")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--features',
+                        help="pre-computed feature table (snap, json, csv, parquet)")
+    source.add_argument('--events', help="raw event log to recompute features from")
+    parser.add_argument('--model', default='models/lg_churn.pkl')
+    parser.add_argument('--output', required=True, help="output directory")
+    parser.add_argument('--format', default='parquet', choices=['parquet', 'csv'])
+    parser.add_argument('--chunk-size', type=int, default=100000)
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.features:
+        features = load_feature_table(args.features)
+    else:
+        features = compute_feature_table(args.events, model_states(joblib.load(args.model)))
+
+    predictions = bulk_score(features, args.model, args.output, args.chunk_size,
+                             args.workers, args.format)
+    counts = predictions['risk_level'].value_counts().to_dict()
+    print(f"Scored {len(predictions):,} users in {time.perf_counter() - start:.1f}s "
+          f"{counts}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+import cProfile
+import functools
+import inspect
+import os
+import pstats
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+# Latency buckets in seconds, Prometheus client defaults
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0.0)
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}",
+                 f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return "\n".join(lines)
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [bucket counts..., sum, count]
+        self._values: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def count(self, **labels) -> int:
+        state = self._values.get(tuple(sorted(labels.items())))
+        return state[-1] if state else 0
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}",
+                 f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                for bound, bucket_count in zip(self.buckets, state):
+                    le = key + (("le", repr(float(bound))),)
+                    lines.append(f"{self.name}_bucket{_format_labels(le)} {bucket_count}")
+                inf = key + (("le", "+Inf"),)
+                lines.append(f"{self.name}_bucket{_format_labels(inf)} {state[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {state[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {state[-1]}")
+        return "\n".join(lines)
+
+
+class MetricsRegistry:
+    """In-process metrics store rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        if name not in self._metrics:
+            self._metrics[name] = Counter(name, documentation)
+        return self._metrics[name]
+
+    def histogram(self, name: str, documentation: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+        if name not in self._metrics:
+            self._metrics[name] = Histogram(name, documentation, buckets)
+        return self._metrics[name]
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUEST_COUNT = registry.counter(
+    "churn_api_requests_total", "Total HTTP requests by endpoint and status code")
+REQUEST_LATENCY = registry.histogram(
+    "churn_api_request_duration_seconds", "HTTP request latency by endpoint")
+SPAN_LATENCY = registry.histogram(
+    "churn_api_span_duration_seconds", "Time spent in each stage of a prediction")
+MODEL_CACHE = registry.counter(
+    "churn_api_model_cache_total", "Model lookups by result (hit or miss)")
+FEATURE_CACHE = registry.counter(
+    "churn_api_feature_store_total", "Feature store lookups by result (hit or miss)")
+
+
+def span(name: str):
+    """Time a stage of request handling into the span histogram"""
+    return SPAN_LATENCY.time(span=name)
+
+
+# Profilers started in worker threads on behalf of the request being profiled
+_thread_profilers: ContextVar[Optional[list]] = ContextVar("thread_profilers", default=None)
+
+
+class RequestProfiler:
+    """Sampling per-request profiler that can be toggled at runtime
+
+    When enabled, a sample_rate fraction of requests to profiled endpoints run
+    under cProfile (or pyinstrument, if installed) and the result is dumped
+    to output_dir, one file per request. Profilers only see their own
+    thread, so work a request hands to a threadpool must be decorated with
+    profile_thread to appear in its dump.
+    """
+
+    MODES = ("cprofile", "pyinstrument")
+
+    def __init__(self, output_dir: str = "profiles"):
+        self.enabled = False
+        self.sample_rate = 1.0
+        self.mode = "cprofile"
+        self.output_dir = output_dir
+        self.dumped = 0
+        self._lock = threading.Lock()
+
+    def configure(self, enabled: bool, sample_rate: float = 1.0,
+                  mode: str = "cprofile", output_dir: Optional[str] = None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown profiler mode: {mode}")
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be between 0 and 1")
+        if enabled and mode == "pyinstrument":
+            import pyinstrument  # noqa: F401  raises ImportError if missing
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.mode = mode
+        if output_dir is not None:
+            self.output_dir = output_dir
+
+    def state(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "mode": self.mode,
+            "output_dir": self.output_dir,
+            "profiles_written": self.dumped,
+        }
+
+    def _should_profile(self) -> bool:
+        return self.enabled and random.random() < self.sample_rate
+
+    def _dump_path(self, name: str, suffix: str) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        return os.path.join(self.output_dir, f"{name}_{stamp}.{suffix}")
+
+    def _start(self):
+        if self.mode == "pyinstrument":
+            from pyinstrument import Profiler
+
+            profiler = Profiler()
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler
+
+    def _stop(self, profiler, name: str, thread_profilers: list):
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            stats = pstats.Stats(profiler)
+            for extra in thread_profilers:
+                stats.add(extra)
+            stats.dump_stats(self._dump_path(name, "prof"))
+        else:
+            profiler.stop()
+            with open(self._dump_path(name, "txt"), "w") as f:
+                for each in [profiler] + thread_profilers:
+                    f.write(each.output_text())
+        self.dumped += 1
+
+    def profile_thread(self, func):
+        """Decorator profiling func in its worker thread for the active request
+
+        Context variables follow run_in_threadpool, so a call made while a
+        request is profiled runs under its own profiler, merged into the
+        request's dump when it stops. Otherwise func runs untouched.
+        """
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            thread_profilers = _thread_profilers.get()
+            if thread_profilers is None:
+                return func(*args, **kwargs)
+            profiler = self._start()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                if isinstance(profiler, cProfile.Profile):
+                    profiler.disable()
+                else:
+                    profiler.stop()
+                thread_profilers.append(profiler)
+
+        return wrapper
+
+    def profile(self, func):
+        """Decorator profiling sampled calls of func
+
+        Only one call is profiled at a time, so nested or concurrent calls
+        run unprofiled. For coroutines the profile also covers whatever else
+        the event loop runs while the call is suspended.
+        """
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not self._should_profile() or not self._lock.acquire(blocking=False):
+                    return await func(*args, **kwargs)
+                token = _thread_profilers.set([])
+                try:
+                    profiler = self._start()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        self._stop(profiler, func.__name__, _thread_profilers.get())
+                finally:
+                    _thread_profilers.reset(token)
+                    self._lock.release()
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self._should_profile() or not self._lock.acquire(blocking=False):
+                return func(*args, **kwargs)
+            token = _thread_profilers.set([])
+            try:
+                profiler = self._start()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self._stop(profiler, func.__name__, _thread_profilers.get())
+            finally:
+                _thread_profilers.reset(token)
+                self._lock.release()
+
+        return wrapper
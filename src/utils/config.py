@@ -14,9 +14,22 @@ class Settings(BaseSettings):
     # API
     api_host: str = "0.0.0.0"
     api_port: int = 8000
+    profile_dir: str = "profiles"
+    # Exposes /debug/profiling, which can write a profile per request to disk
+    enable_debug_endpoints: bool = False
+    feature_snapshot_path: Optional[str] = None
     
     # Redis
     redis_url: str = "redis://localhost:6379"
+
+    # Backends: feature_backend is 'snapshot', 'redis' or 'memory';
+    # prediction_log_backend is 'none', 'sqlite' or 'postgres'
+    feature_backend: str = "snapshot"
+    prediction_log_backend: str = "none"
+    sqlite_path: str = "predictions.db"
+    backend_pool_size: int = 10
+    log_batch_size: int = 500
+    log_flush_interval: float = 1.0
     
     class Config:
         env_file = ".env"
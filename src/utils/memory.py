@@ -0,0 +1,43 @@
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+MB = 1024 * 1024
+
+
+class MemoryTracker:
+    """Record time and peak traced memory of each pipeline stage
+
+    Uses tracemalloc, which sees numpy buffers and Python objects. peak_mb is
+    the most memory allocated at any point during a stage on top of what
+    was allocated when it started.
+    """
+
+    def __init__(self):
+        self.stages = []
+
+    @contextmanager
+    def track(self, name: str):
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            if started:
+                tracemalloc.stop()
+            self.stages.append({
+                'stage': name,
+                'seconds': time.perf_counter() - start,
+                'peak_mb': (peak - before) / MB,
+                'retained_mb': (current - before) / MB,
+            })
+
+    def report(self) -> pd.DataFrame:
+        return pd.DataFrame(self.stages).set_index('stage')
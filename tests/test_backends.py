@@ -0,0 +1,102 @@
+import asyncio
+import pytest
+import pandas as pd
+from fastapi.testclient import TestClient
+from src.api.backends import (
+    FeatureStore, InMemoryRedis, PredictionLogger, RedisFeatureStore,
+    SQLitePredictionStore,
+)
+from src.api.main import app, feature_snapshot
+from src.data.feature_snapshot import FeatureSnapshot
+
+def make_snapshot():
+    features = pd.DataFrame({
+        'total_events': [10.0, 250.0],
+        'usage_frequency': [0.5, 0.25],
+    }, index=pd.Index([7, 42], name='user_id'))
+    return FeatureSnapshot.from_frame(features)
+
+def test_redis_feature_store_multi_get():
+    async def run():
+        store = RedisFeatureStore(InMemoryRedis(), chunk_size=1)
+        await store.publish(make_snapshot())
+        return await store.get_many([42, 8, 7]), await store.get(7)
+
+    rows, single = asyncio.run(run())
+
+    assert rows == [{'total_events': 250.0, 'usage_frequency': 0.25}, None,
+                    {'total_events': 10.0, 'usage_frequency': 0.5}]
+    assert single == rows[2]
+
+def test_prediction_logger_bulk_inserts(tmp_path):
+    async def run():
+        store = SQLitePredictionStore(str(tmp_path / 'predictions.db'), pool_size=2)
+        logger = PredictionLogger(store, '1.0.0', batch_size=2, flush_interval=60)
+        await logger.start()
+        for user_id in range(5):
+            logger.log(user_id, 0.1 * user_id, user_id > 2, 'low')
+        await asyncio.sleep(0.1)
+        flushed_early = len(await store.fetch_all())
+        await logger.flush()
+        rows = await store.fetch_all()
+        await logger.close()
+        return flushed_early, rows
+
+    flushed_early, rows = asyncio.run(run())
+
+    assert flushed_early >= 2
+    assert [row[0] for row in rows] == [0, 1, 2, 3, 4]
+    assert rows[4][2] == 1
+
+def test_batch_predict_skips_unknown_users():
+    known = [int(user_id) for user_id in feature_snapshot.user_ids[:3]]
+    with TestClient(app) as client:
+        batch = client.post('/batch_predict', json=known + [-1]).json()
+        single = [client.post('/predict', json={'user_id': user_id}).json()
+                  for user_id in known]
+
+    assert batch == single
+
+def test_backends_must_implement_interface():
+    class Incomplete(FeatureStore):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+def test_redis_backend_is_published_and_reloaded(monkeypatch):
+    from src.api import main
+
+    redis = InMemoryRedis()
+    monkeypatch.setattr(main.settings, 'feature_backend', 'redis')
+    monkeypatch.setattr(main, 'create_feature_store',
+                        lambda *args: RedisFeatureStore(redis))
+    user_id = int(feature_snapshot.user_ids[0])
+    with TestClient(app) as client:
+        before = client.post('/predict', json={'user_id': user_id})
+
+        # Republish with reversed columns, as the publish CLI would
+        frame = feature_snapshot.to_frame()
+        reordered = FeatureSnapshot.from_frame(frame[frame.columns[::-1]])
+        asyncio.run(RedisFeatureStore(redis).publish(reordered))
+        assert client.post('/features/reload').status_code == 200
+        after = client.post('/predict', json={'user_id': user_id})
+
+    assert before.status_code == 200
+    assert after.json() == before.json()
+
+def test_feature_store_failure_is_503(monkeypatch):
+    from src.api import main
+
+    class Down(FeatureStore):
+        async def get_many(self, user_ids):
+            raise ConnectionError('redis is down')
+
+    user_id = int(feature_snapshot.user_ids[0])
+    with TestClient(app) as client:
+        monkeypatch.setattr(main, 'feature_store', Down())
+        batch = client.post('/batch_predict', json=[user_id])
+        single = client.post('/predict', json={'user_id': user_id})
+
+    assert batch.status_code == 503
+    assert single.status_code == 503
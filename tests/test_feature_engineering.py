@@ -0,0 +1,66 @@
+import pandas as pd
+import pytest
+from benchmarks.synthetic_data import generate_event_log
+from src.data.feature_engineering import create_all_features, create_all_features_partitioned
+from src.data.preprocessing import preprocess_pipeline
+
+@pytest.fixture(scope='module')
+def events():
+    return preprocess_pipeline(generate_event_log(10000, seed=2), low_memory=True)
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_partitioned_matches_single_process(events, workers):
+    expected = create_all_features(events)
+
+    result = create_all_features_partitioned(events, n_partitions=3, workers=workers)
+
+    pd.testing.assert_frame_equal(result, expected)
+
+def test_partitioned_reference_date_includes_events_without_user(events):
+    late = events.iloc[[-1]].assign(userId=None, ts=events['ts'].max() + pd.Timedelta('5D'))
+    with_late = pd.concat([events, late], ignore_index=True)
+
+    result = create_all_features_partitioned(with_late, n_partitions=2, workers=1)
+
+    pd.testing.assert_frame_equal(result, create_all_features(with_late))
+    with pytest.raises(ValueError):
+        create_all_features_partitioned(events.iloc[:0], workers=1)
+
+def test_max_date_is_broadcast(events):
+    one_user = events[events['userId'] == events['userId'].iloc[0]]
+
+    local = create_all_features(one_user)
+    broadcast = create_all_features(one_user, max_date=events['ts'].max())
+
+    assert (broadcast['days_since_last_activity']
+            >= local['days_since_last_activity']).all()
+    assert broadcast['days_since_last_activity'].iloc[0] > 0
+
+def test_cached_features_only_recompute_invalidated_groups(events, tmp_path, monkeypatch,
+                                                          caplog):
+    from src.data import feature_engineering as fe
+
+    def build():
+        caplog.clear()
+        with caplog.at_level('INFO', logger=fe.__name__):
+            result = fe.create_all_features_cached(events, str(tmp_path))
+        return result, caplog.records[-1].recomputed
+
+    expected = create_all_features(events)
+
+    first, recomputed = build()
+    assert recomputed == list(fe.FEATURE_GROUPS)
+
+    cached, recomputed = build()
+    assert recomputed == []
+
+    group = fe.FEATURE_GROUPS['create_session_pattern_features']
+    monkeypatch.setitem(fe.FEATURE_GROUPS, 'create_session_pattern_features',
+                        group._replace(version=group.version + 1))
+    bumped, recomputed = build()
+    assert recomputed == ['create_session_pattern_features']
+    # The superseded version's file is evicted
+    assert len(list(tmp_path.glob('*.parquet'))) == len(fe.FEATURE_GROUPS)
+
+    for result in (first, cached, bumped):
+        pd.testing.assert_frame_equal(result, expected)
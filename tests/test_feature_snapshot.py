@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.data.feature_snapshot import load_snapshot, write_snapshot
+
+def make_features():
+    return pd.DataFrame({
+        'total_events': [10, 250, 3],
+        'is_paid': [1, 0, 1],
+        'gender_F': [True, False, True],
+        'usage_frequency': [0.5, 0.25, 1.0],
+    }, index=pd.Index([300, 7, 42], name='user_id'))
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_snapshot_roundtrip(tmp_path, mmap):
+    path = str(tmp_path / 'features.snap')
+    features = make_features()
+    write_snapshot(features, path, feature_names=['usage_frequency', 'total_events',
+                                                  'is_paid', 'gender_F'])
+
+    snapshot = load_snapshot(path, mmap=mmap)
+
+    assert list(snapshot.user_ids) == [7, 42, 300]
+    assert snapshot.feature_names[0] == 'usage_frequency'
+    assert snapshot.get(42) == {'usage_frequency': 1.0, 'total_events': 3.0,
+                                'is_paid': 1.0, 'gender_F': 1.0}
+    assert snapshot.get(8) is None
+    restored = snapshot.to_frame()
+    pd.testing.assert_frame_equal(restored, features.sort_index()[restored.columns])
+
+def test_snapshot_publish_replaces_atomically(tmp_path):
+    path = str(tmp_path / 'features.snap')
+    write_snapshot(make_features(), path)
+    old = load_snapshot(path)
+
+    updated = make_features()
+    updated['total_events'] = updated['total_events'] * 2
+    write_snapshot(updated, path)
+
+    assert old.get(7)['total_events'] == 250.0
+    assert load_snapshot(path).get(7)['total_events'] == 500.0
+    assert [p.name for p in tmp_path.iterdir()] == ['features.snap']
+
+def test_snapshot_rejects_other_files(tmp_path):
+    path = tmp_path / 'features.json'
+    path.write_text('{"user_id": {}}')
+
+    with pytest.raises(ValueError):
+        load_snapshot(str(path))
+
+def test_cli_builds_snapshot_from_event_log(tmp_path, monkeypatch):
+    import joblib
+    from benchmarks.synthetic_data import generate_event_log
+    from src.data.feature_snapshot import main
+
+    events_path = tmp_path / 'events.json'
+    generate_event_log(3000, seed=4).to_json(events_path, orient='records', lines=True)
+    monkeypatch.setattr('sys.argv', [
+        'feature_snapshot', '--events', str(events_path),
+        '--model', 'models/lg_churn.pkl', '--output', str(tmp_path / 'features.snap'),
+    ])
+    main()
+
+    snapshot = load_snapshot(str(tmp_path / 'features.snap'))
+    model = joblib.load('models/lg_churn.pkl')
+    assert snapshot.feature_names == list(model.feature_names_in_)
+    assert len(snapshot) > 0
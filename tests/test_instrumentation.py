@@ -0,0 +1,70 @@
+import pytest
+from fastapi.testclient import TestClient
+from src.api.main import app, feature_snapshot
+from src.monitoring.instrumentation import Histogram, RequestProfiler
+from src.utils.config import settings
+
+def test_histogram_render():
+    hist = Histogram('latency_seconds', 'Test latency', buckets=(0.1, 1.0))
+    hist.observe(0.05, endpoint='/predict')
+    hist.observe(0.5, endpoint='/predict')
+
+    text = hist.render()
+
+    assert 'latency_seconds_bucket{endpoint="/predict",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{endpoint="/predict",le="1.0"} 2' in text
+    assert 'latency_seconds_count{endpoint="/predict"} 2' in text
+
+def test_metrics_endpoint():
+    user_id = int(feature_snapshot.user_ids[0])
+    with TestClient(app) as client:
+        assert client.post('/predict', json={'user_id': user_id}).status_code == 200
+        text = client.get('/metrics').text
+
+    assert 'churn_api_requests_total{endpoint="/predict",status="200"}' in text
+    assert 'churn_api_span_duration_seconds_count{span="model_scoring"}' in text
+    assert 'churn_api_feature_store_total{result="hit"}' in text
+
+def test_profiler_toggle(tmp_path):
+    profiler = RequestProfiler(str(tmp_path))
+    traced = profiler.profile(lambda x: x + 1)
+
+    assert traced(1) == 2
+    assert profiler.dumped == 0
+
+    profiler.configure(enabled=True, sample_rate=1.0)
+    assert traced(1) == 2
+    assert len(list(tmp_path.glob('*.prof'))) == 1
+
+    with pytest.raises(ValueError):
+        profiler.configure(enabled=True, mode='perf')
+
+def test_debug_endpoints_disabled_by_default(monkeypatch):
+    config = {'enabled': False, 'sample_rate': 1.0, 'mode': 'cprofile'}
+    with TestClient(app) as client:
+        assert client.post('/debug/profiling', json=config).status_code == 404
+        assert client.get('/debug/profiling').status_code == 404
+
+        monkeypatch.setattr(settings, 'enable_debug_endpoints', True)
+        response = client.post('/debug/profiling', json=config)
+
+    assert response.status_code == 200
+    assert response.json()['enabled'] is False
+
+def test_profile_covers_threadpool_scoring(tmp_path):
+    import pstats
+    from src.api.main import profiler
+
+    user_id = int(feature_snapshot.user_ids[0])
+    output_dir = profiler.output_dir
+    profiler.configure(enabled=True, sample_rate=1.0, output_dir=str(tmp_path))
+    try:
+        with TestClient(app) as client:
+            assert client.post('/predict', json={'user_id': user_id}).status_code == 200
+    finally:
+        profiler.configure(enabled=False, output_dir=output_dir)
+
+    dumps = list(tmp_path.glob('predict_churn_*.prof'))
+    assert len(dumps) == 1
+    functions = {func for _, _, func in pstats.Stats(str(dumps[0])).stats}
+    assert {'_score', 'predict_proba'} <= functions
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from benchmarks.load_test import UserSampler, check_slos, parse_mix, parse_slo, summarize
+
+def test_zipf_sampler_concentrates_on_hot_users():
+    user_ids = np.arange(1000)
+    zipf = UserSampler(user_ids, 'zipf', zipf_s=1.2).sample(20000)
+    uniform = UserSampler(user_ids, 'uniform').sample(20000)
+
+    assert set(zipf) <= set(user_ids)
+    hottest = np.bincount(zipf).max() / len(zipf)
+    assert hottest > 0.1
+    assert np.bincount(uniform).max() / len(uniform) < 0.01
+
+def test_slo_gate_reports_breaches():
+    samples = ([('/predict', 0.010, 200)] * 98 + [('/predict', 0.200, 200)] * 2
+               + [('/batch_predict', 0.050, 200), ('/batch_predict', 0.050, 500)])
+    report = summarize(samples, elapsed=2.0)
+
+    assert report['endpoints']['/predict']['requests'] == 100
+    assert report['endpoints']['/predict']['throughput_rps'] == 50
+    assert report['endpoints']['/batch_predict']['error_rate'] == 0.5
+
+    slos = [parse_slo('/predict:p50_ms=20'), parse_slo('*:error_rate=0.01'),
+            parse_slo('/predict:throughput_rps=10')]
+    assert check_slos(report, slos) == ['/batch_predict error_rate=0.5 (limit 0.01)']
+    assert len(check_slos(report, [parse_slo('/predict:p99_ms=100')])) == 1
+
+def test_client_errors_count_against_error_rate():
+    samples = [('/predict', 0.010, 200)] * 8 + [('/predict', 0.010, 404),
+                                                ('/predict', 0.010, 0)]
+    stats = summarize(samples, elapsed=1.0)['endpoints']['/predict']
+
+    assert stats['error_rate'] == 0.2
+    assert stats['client_error_rate'] == 0.1
+    assert stats['server_error_rate'] == 0.1
+    report = summarize(samples[:8] + samples[8:9], elapsed=1.0)
+    assert check_slos(report, [parse_slo('*:error_rate=0.01')])
+
+def test_parse_mix_normalizes_weights():
+    assert parse_mix('predict=3,batch_predict=1') == {'/predict': 0.75,
+                                                      '/batch_predict': 0.25}
+    with pytest.raises(ValueError):
+        parse_slo('/predict:p42_ms=10')
@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+from benchmarks.synthetic_data import generate_event_log
+from src.data.feature_engineering import create_all_features
+from src.data.point_in_time import create_point_in_time_features
+from src.data.preprocessing import preprocess_pipeline
+
+CUTOFFS = pd.to_datetime(['2018-10-10', '2018-10-25', '2018-11-15'])
+
+@pytest.fixture(scope='module')
+def events():
+    return preprocess_pipeline(generate_event_log(10000, seed=1))
+
+def test_matches_truncated_full_build(events):
+    features = create_point_in_time_features(events, CUTOFFS, '14D',
+                                             include_churned=True)
+
+    for cutoff in CUTOFFS:
+        expected = create_all_features(events[events['ts'] <= cutoff])
+        result = features.xs(cutoff, level='cutoff').rename_axis(None)
+        pd.testing.assert_frame_equal(
+            result.drop(columns='is_churned').sort_index(),
+            expected.drop(columns='is_churned').sort_index(),
+            check_dtype=False, check_index_type=False,
+        )
+
+def test_labels_use_horizon_after_cutoff(events):
+    features = create_point_in_time_features(events, CUTOFFS, '14D')
+    cancels = events[events['page'] == 'Cancellation Confirmation']
+
+    for cutoff in CUTOFFS:
+        labels = features.xs(cutoff, level='cutoff')['is_churned']
+        in_horizon = cancels[(cancels['ts'] > cutoff)
+                             & (cancels['ts'] <= cutoff + pd.Timedelta('14D'))]
+        already_churned = cancels.loc[cancels['ts'] <= cutoff, 'userId']
+
+        assert set(labels[labels == 1].index) == set(in_horizon['userId'])
+        assert not labels.index.isin(already_churned).any()
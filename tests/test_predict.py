@@ -0,0 +1,75 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from src.models.predict import assign_risk_levels, bulk_score, load_feature_table
+
+MODEL_PATH = 'models/lg_churn.pkl'
+FEATURES_PATH = 'src/data/user_features.json'
+
+def test_assign_risk_levels():
+    levels = assign_risk_levels(np.array([0.0, 0.29, 0.3, 0.69, 0.7, 1.0]))
+
+    assert list(levels) == ['low', 'low', 'medium', 'medium', 'high', 'high']
+
+def test_bulk_score_resumes_from_checkpoints(tmp_path):
+    features = load_feature_table(FEATURES_PATH)
+
+    first = bulk_score(features, MODEL_PATH, str(tmp_path), chunk_size=100,
+                       workers=1, output_format='csv')
+    os.remove(tmp_path / 'chunks' / 'chunk_00002.csv')
+    resumed = bulk_score(features, MODEL_PATH, str(tmp_path), chunk_size=100,
+                         workers=1, output_format='csv')
+
+    assert len(first) == len(features)
+    assert first['user_id'].tolist() == features.index.tolist()
+    pd.testing.assert_frame_equal(first, resumed)
+
+def test_bulk_score_rejects_changed_config(tmp_path):
+    features = load_feature_table(FEATURES_PATH)
+    bulk_score(features, MODEL_PATH, str(tmp_path), chunk_size=100,
+               workers=1, output_format='csv')
+
+    with pytest.raises(ValueError):
+        bulk_score(features, MODEL_PATH, str(tmp_path), chunk_size=50,
+                   workers=1, output_format='csv')
+
+def test_bulk_score_rejects_changed_features(tmp_path):
+    features = load_feature_table(FEATURES_PATH)
+    bulk_score(features, MODEL_PATH, str(tmp_path), chunk_size=100,
+               workers=1, output_format='csv')
+
+    changed = features.copy()
+    changed['total_events'] += 1
+    with pytest.raises(ValueError):
+        bulk_score(changed, MODEL_PATH, str(tmp_path), chunk_size=100,
+                   workers=1, output_format='csv')
+
+def test_bulk_score_matches_api(tmp_path):
+    from fastapi.testclient import TestClient
+    from src.api.main import app
+
+    features = load_feature_table(FEATURES_PATH)
+    offline = bulk_score(features, MODEL_PATH, str(tmp_path), chunk_size=1000,
+                         workers=1, output_format='csv')
+    with TestClient(app) as client:
+        online = pd.DataFrame(client.post('/batch_predict',
+                                          json=features.index.tolist()).json())
+
+    pd.testing.assert_frame_equal(offline, online, check_dtype=False)
+
+def test_main_scores_raw_event_log(tmp_path):
+    from benchmarks.synthetic_data import generate_event_log
+    from src.models.predict import main
+
+    events_path = tmp_path / 'events.json'
+    events = generate_event_log(5000, seed=3)
+    events.to_json(events_path, orient='records', lines=True)
+
+    main(['--events', str(events_path), '--output', str(tmp_path / 'out'),
+          '--workers', '1', '--format', 'csv'])
+
+    predictions = pd.read_csv(tmp_path / 'out' / 'predictions.csv')
+    user_ids = events['userId'].replace('', None).dropna().astype(int)
+    assert set(predictions['user_id']) == set(user_ids)
+    assert predictions['risk_level'].isin(['low', 'medium', 'high']).all()
@@ -23,4 +23,33 @@ def test_clean_user_ids():
     result = clean_user_ids(df)
     
     assert result['userId'].dtype == 'float64'
-    assert result['userId'].isna().sum() == 2  # Empty string and 'abc'
\ No newline at end of file
+    assert result['userId'].isna().sum() == 2  # Empty string and 'abc'
+
+def test_clean_user_ids_categorical():
+    df = pd.DataFrame({
+        'userId': pd.Categorical(['123', '', '456', 'abc', '123'])
+    })
+
+    result = clean_user_ids(df)
+
+    assert result['userId'].dtype == 'float64'
+    assert result['userId'].tolist()[::4] == [123.0, 123.0]
+    assert result['userId'].isna().sum() == 2
+
+def test_low_memory_pipeline_gives_same_features():
+    from benchmarks.synthetic_data import generate_event_log
+    from src.data.feature_engineering import create_all_features
+    from src.data.preprocessing import preprocess_pipeline
+    from src.utils.memory import MemoryTracker
+
+    raw = generate_event_log(3000, seed=0)
+    tracker = MemoryTracker()
+
+    expected = create_all_features(preprocess_pipeline(raw.copy()))
+    df = preprocess_pipeline(raw.copy(), low_memory=True, memory_tracker=tracker)
+
+    assert isinstance(df['page'].dtype, pd.CategoricalDtype)
+    assert df['sessionId'].dtype == np.int32
+    assert df['userId'].dtype == np.int32
+    pd.testing.assert_frame_equal(create_all_features(df), expected)
+    assert 'impute_missing_userids' in tracker.report().index
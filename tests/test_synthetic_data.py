@@ -0,0 +1,19 @@
+import pandas as pd
+from benchmarks.synthetic_data import generate_event_log
+from src.data.preprocessing import preprocess_pipeline
+
+def test_generate_event_log_schema():
+    df = generate_event_log(2000, seed=0)
+
+    assert len(df) == 2000
+    assert df['ts'].is_monotonic_increasing
+    assert (df['userId'] == '').any()
+    assert df.loc[df['page'] == 'NextSong', 'song'].notna().all()
+    assert df.loc[df['page'] != 'NextSong', 'song'].isna().all()
+
+def test_generate_event_log_preprocesses():
+    df = preprocess_pipeline(generate_event_log(2000, seed=0))
+
+    assert pd.api.types.is_datetime64_any_dtype(df['ts'])
+    assert df['imputed'].any()
+    assert (df['page'] == 'Cancellation Confirmation').any()